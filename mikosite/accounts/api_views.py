@@ -1,19 +1,30 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
 from django.db.models import Sum
+from django.utils import timezone
 from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from django_filters import rest_framework as filters
 from django_filters import UnknownFieldBehavior
 
-from .models import User, LinkedAccount, ActivityScore
+from .models import SCORE_VERSION, USER_DISPLAY_VERSION, User, LinkedAccount, ActivityScore, DailyActivityScore
 from .serializers import UserSerializer, SafeUserSerializer, LinkedAccountSerializer, ActivityScoreSerializer
 
 from mikosite.permissions import IsAdminUserOrDetailReadOnly
+from mikosite.versioning import ConditionalGetMixin
+
+
+LEADERBOARD_WINDOWS = ('week', 'month', 'season')
+SEASON_START_MONTH = 9
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all().defer('password', 'date_of_birth')
+    version_models = (User, LinkedAccount)
     serializer_class = SafeUserSerializer
     permission_classes = (IsAdminUserOrDetailReadOnly,)
 
@@ -31,8 +42,9 @@ class LinkedAccountFilter(filters.FilterSet):
         fields = ['user', 'external_id', 'platform']
 
 
-class LinkedAccountViewSet(viewsets.ModelViewSet):
+class LinkedAccountViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = LinkedAccount.objects.all()
+    version_models = (LinkedAccount,)
     serializer_class = LinkedAccountSerializer
     permission_classes = (IsAdminUser,)
     filter_backends = (filters.DjangoFilterBackend,)
@@ -49,47 +61,120 @@ class ActivityScoreFilter(filters.FilterSet):
         fields = ['user']
 
 
-class ActivityScoreViewSet(viewsets.ModelViewSet):
+class ActivityScoreViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ActivityScore.objects.all()
+    version_models = (ActivityScore,)
+    cursor_ordering = ('timestamp', 'id')
     serializer_class = ActivityScoreSerializer
     permission_classes = (IsAdminUser,)
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = ActivityScoreFilter
 
 
-class UserActivityViewSet(GenericViewSet):
+def leaderboard_window(params) -> Optional[tuple]:
+    """
+    Get the date range of a leaderboard from query parameters.
+
+    `window` is `week` (since Monday), `month` or `season` (since September 1st), all ending today.
+    Otherwise `start_date` and `end_date` (inclusive, both optional) select an arbitrary range.
+
+    Returns:
+        Optional[tuple]: (first date, last date), None for the all-time leaderboard.
+    """
+    today = timezone.localdate()
+    window = params.get('window')
+    if window == 'week':
+        return today - timedelta(days=today.weekday()), today
+    if window == 'month':
+        return today.replace(day=1), today
+    if window == 'season':
+        season_year = today.year if today.month >= SEASON_START_MONTH else today.year - 1
+        return date(season_year, SEASON_START_MONTH, 1), today
+    if window is not None:
+        raise ValidationError({'window': f"Must be one of: {', '.join(LEADERBOARD_WINDOWS)}."})
+
+    if 'start_date' not in params and 'end_date' not in params:
+        return None
+    try:
+        return (date.fromisoformat(params.get('start_date', date.min.isoformat())),
+                date.fromisoformat(params.get('end_date', date.max.isoformat())))
+    except ValueError:
+        raise ValidationError({'detail': "Dates must be in the YYYY-MM-DD format."})
+
+
+class UserActivityViewSet(ConditionalGetMixin, GenericViewSet):
+    """
+    Leaderboard of activity scores, all-time or within a window (see `leaderboard_window`).
+
+    All-time scores come from the running totals on users, windowed ones from the daily rollups,
+    so neither reads the ActivityScore rows.
+    """
     queryset = User.objects.all()
     permission_classes = (IsAdminUser,)
+    version_models = (USER_DISPLAY_VERSION, SCORE_VERSION)
+
+    @staticmethod
+    def leaderboard_entry(user, total_score):
+        return {'id': user.id,
+                'username': user.username,
+                'full_name': user.full_name,
+                'total_score': total_score, }
+
+    def get_variant(self, request):
+        window = leaderboard_window(request.query_params)
+        if 'window' not in request.query_params:
+            return repr(window), None
+        # The range moves at midnight, even if no score changes then
+        today = timezone.localdate()
+        midnight = timezone.make_aware(datetime.combine(today, time.min))
+        return repr(window), midnight.timestamp()
 
     def list(self, request):
-        users_with_scores = (
-            User.objects.all()
-            .only('id', 'username', 'name', 'surname')
-            .annotate(total_score=Sum('activity_scores__change'))
-            .filter(total_score__isnull=False)
-            .order_by('-total_score')
-        )
-
-        page = self.paginate_queryset(users_with_scores)
+        return self.conditional(self.leaderboard, request)
+
+    def retrieve(self, request, pk=None):
+        return self.conditional(self.user_score, request, pk=pk)
+
+    def leaderboard(self, request):
+        window = leaderboard_window(request.query_params)
+        if window is None:
+            # Matches the partial index on the running totals, so every page is an index scan with a LIMIT
+            scores = (
+                User.objects.all()
+                .only('id', 'username', 'name', 'surname', 'total_score')
+                .filter(score_entries__gt=0)
+                .order_by('-total_score', 'id')
+            )
+        else:
+            scores = (
+                DailyActivityScore.objects.filter(date__range=window)
+                .values('user')
+                .annotate(total_score=Sum('total'), entries=Sum('entries'))
+                .filter(entries__gt=0)
+                .order_by('-total_score', 'user')
+            )
+
+        page = self.paginate_queryset(scores)
         if page is None:  # pagination is disabled in settings
             return Response({'detail': "Improper pagination settings."},
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        data = [{'id': user.id,
-                 'username': user.username,
-                 'full_name': user.full_name,
-                 'total_score': user.total_score, }
-                for user in page]
+        if window is None:
+            data = [self.leaderboard_entry(user, user.total_score) for user in page]
+        else:
+            users = User.objects.only('id', 'username', 'name', 'surname').in_bulk([row['user'] for row in page])
+            data = [self.leaderboard_entry(users[row['user']], row['total_score']) for row in page]
         return self.get_paginated_response(data)
 
-    def retrieve(self, request, pk=None):
+    def user_score(self, request, pk=None):
+        window = leaderboard_window(request.query_params)
         try:
             user = self.get_object()
-            return Response({
-                'id': user.id,
-                'username': user.username,
-                'full_name': user.full_name,
-                'total_score': user.activity_score,
-            })
+            if window is None:
+                total_score = user.activity_score
+            else:
+                total_score = (user.daily_activity_scores.filter(date__range=window)
+                               .aggregate(total_score=Sum('total'))['total_score'] or 0)
+            return Response(self.leaderboard_entry(user, total_score))
         except User.DoesNotExist:
             return Response({'detail': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
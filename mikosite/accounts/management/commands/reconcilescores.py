@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Recalculates the running activity score totals of users that differ from their activity scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rollups', action='store_true', help='Also rebuild the daily score rollups')
+
+    def handle(self, *args, **kwargs):
+        fixed = User.reconcile_scores()
+        print(f"Fixed the score totals of {fixed} users")
+        if kwargs['rollups']:
+            User.rebuild_daily_scores()
+            print("Rebuilt the daily score rollups")
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def compute_total_scores(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    ActivityScore = apps.get_model('accounts', 'ActivityScore')
+    totals = (ActivityScore.objects.filter(user=OuterRef('pk')).order_by().values('user')
+              .annotate(total=Sum('change'), entries=Count('id')))
+    User.objects.update(total_score=Coalesce(Subquery(totals.values('total')), 0),
+                        score_entries=Coalesce(Subquery(totals.values('entries')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_remove_linkedaccount_accounts_li_externa_ed775c_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='score_entries',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='total_score',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(compute_total_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('score_entries__gt', 0)), fields=['-total_score', 'id'], name='user_total_score_index'),
+        ),
+    ]
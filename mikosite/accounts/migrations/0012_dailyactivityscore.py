@@ -0,0 +1,40 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def build_daily_scores(apps, schema_editor):
+    ActivityScore = apps.get_model('accounts', 'ActivityScore')
+    DailyActivityScore = apps.get_model('accounts', 'DailyActivityScore')
+    days = (ActivityScore.objects.annotate(date=TruncDate('timestamp')).order_by().values('user', 'date')
+            .annotate(total=Sum('change'), entries=Count('id')))
+    DailyActivityScore.objects.bulk_create(
+        [DailyActivityScore(user_id=day['user'], date=day['date'], total=day['total'], entries=day['entries'])
+         for day in days], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_user_total_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivityScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity_scores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'user'], include=('total',), name='daily_activity_score_index')],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(build_daily_scores, migrations.RunPython.noop),
+    ]
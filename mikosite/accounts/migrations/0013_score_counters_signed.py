@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_dailyactivityscore'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyactivityscore',
+            name='entries',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='score_entries',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
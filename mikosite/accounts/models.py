@@ -1,10 +1,18 @@
 import uuid
+from collections import defaultdict
+from datetime import datetime
 
-from django.db import models
-from django.db.models import Sum
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import MinLengthValidator, MaxLengthValidator
+from django.db.models.functions import Coalesce, TruncDate
+
+from mikosite.versioning import bump_model_version, track_field_version
+
+
+SCORE_VERSION = 'accounts.score'  # Version of the running totals and rollups, see mikosite.versioning
 
 
 class CustomUserManager(BaseUserManager):
@@ -37,8 +45,15 @@ class User(AbstractUser):
     region = models.CharField(max_length=30, blank=True, validators=[MinLengthValidator(5), MaxLengthValidator(30)])
     date_of_birth = models.DateField(blank=True, null=True)
     profile_image = models.ImageField(upload_to='media/profile_images/', blank=True, null=True)
+    # Running totals of ActivityScore rows, kept by ActivityScore and fixed by `manage.py reconcilescores`
+    total_score = models.IntegerField(default=0, editable=False)
+    score_entries = models.IntegerField(default=0, editable=False)  # Not positive, drift is fixed by reconcilescores
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(name='user_total_score_index', fields=['-total_score', 'id'],
+                                condition=Q(score_entries__gt=0))]
+
     def __str__(self):
         return f"{self.username} ({self.name} {self.surname})"
 
@@ -48,7 +63,73 @@ class User(AbstractUser):
 
     @property
     def activity_score(self):
-        return self.activity_scores.aggregate(Sum('change'))['change__sum'] or 0
+        return self.total_score
+
+    @classmethod
+    def change_scores(cls, changes: list):
+        """
+        Apply changes of the running score totals and the daily rollups with F-expressions.
+
+        Args:
+            changes (list): Tuples (user id, timestamp or local date, score change, number of added entries),
+                with negative values for removed scores.
+        """
+        user_changes, day_changes = defaultdict(lambda: [0, 0]), defaultdict(lambda: [0, 0])
+        for user_id, timestamp, score_change, entries_change in changes:
+            day = timezone.localdate(timestamp) if isinstance(timestamp, datetime) else timestamp
+            for totals in (user_changes[user_id], day_changes[user_id, day]):
+                totals[0] += score_change
+                totals[1] += entries_change
+
+        for user_id, (score_change, entries_change) in user_changes.items():
+            if score_change or entries_change:
+                cls.objects.filter(pk=user_id).update(total_score=F('total_score') + score_change,
+                                                      score_entries=F('score_entries') + entries_change)
+        for (user_id, date), (score_change, entries_change) in day_changes.items():
+            if score_change or entries_change:
+                DailyActivityScore.objects.get_or_create(user_id=user_id, date=date)
+                DailyActivityScore.objects.filter(user_id=user_id, date=date).update(
+                    total=F('total') + score_change, entries=F('entries') + entries_change)
+        bump_model_version(ActivityScore, SCORE_VERSION)  # bulk_create and update send no signals
+
+    @classmethod
+    def reconcile_scores(cls) -> int:
+        """
+        Recalculate the running score totals of users whose totals differ from their ActivityScore rows.
+
+        Returns:
+            int: Number of fixed users.
+        """
+        totals = (ActivityScore.objects.filter(user=models.OuterRef('pk')).order_by().values('user')
+                  .annotate(total=Sum('change'), entries=Count('id')))
+        actual_total = Coalesce(models.Subquery(totals.values('total')), 0)
+        actual_entries = Coalesce(models.Subquery(totals.values('entries')), 0)
+        with transaction.atomic():
+            drifted = list(cls.objects.select_for_update()
+                           .annotate(actual_total=actual_total, actual_entries=actual_entries)
+                           .exclude(total_score=F('actual_total'), score_entries=F('actual_entries'))
+                           .values_list('pk', flat=True))
+            cls.objects.filter(pk__in=drifted).update(total_score=actual_total, score_entries=actual_entries)
+        bump_model_version(SCORE_VERSION)
+        return len(drifted)
+
+    @classmethod
+    def rebuild_daily_scores(cls):
+        """
+        Recalculate all daily rollups from the ActivityScore rows.
+        """
+        days = (ActivityScore.objects.annotate(date=TruncDate('timestamp')).order_by().values('user', 'date')
+                .annotate(total=Sum('change'), entries=Count('id')))
+        with transaction.atomic():
+            DailyActivityScore.objects.all().delete()
+            DailyActivityScore.objects.bulk_create(
+                [DailyActivityScore(user_id=day['user'], date=day['date'], total=day['total'], entries=day['entries'])
+                 for day in days], batch_size=500)
+        bump_model_version(SCORE_VERSION)
+
+
+# Users shown by name in seminars, posts and the leaderboard, which do not change with logins or scores
+USER_DISPLAY_VERSION = track_field_version(User, ('username', 'name', 'surname'), 'accounts.user.display')
 
 
 class LinkedAccount(models.Model):
@@ -65,6 +146,25 @@ class LinkedAccount(models.Model):
         return f"USER {self.user.username} IS {self.external_id} ON {self.platform}"
 
 
+class ActivityScoreQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create does not call save(), so the totals are updated here
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            User.change_scores([(score.user_id, score.timestamp, score.change, 1) for score in objs])
+        return objs
+
+    def delete(self):
+        # The totals are decreased once per user and day, not once per deleted row.
+        # Rows inserted between the two queries by other transactions are fixed by `manage.py reconcilescores`.
+        with transaction.atomic(using=self.db):
+            days = list(self.order_by().values('user', date=TruncDate('timestamp'))
+                        .annotate(total=Sum('change'), entries=Count('id')))
+            result = super().delete()
+            User.change_scores([(day['user'], day['date'], -day['total'], -day['entries']) for day in days])
+        return result
+
+
 class ActivityScore(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, related_name='activity_scores', on_delete=models.CASCADE)
@@ -72,8 +172,49 @@ class ActivityScore(models.Model):
     reason = models.CharField(max_length=255, blank=False, null=False)
     timestamp = models.DateTimeField(default=timezone.now, blank=False, null=False, editable=False)
 
+    objects = ActivityScoreQuerySet.as_manager()
+
     class Meta:
         indexes = [models.Index(name='activity_score_index', fields=['user', 'timestamp'], include=['change'])]
 
     def __str__(self):
         return f"{self.change} POINTS FOR {self.user.username} REASON {self.reason}"
+
+    def save(self, *args, **kwargs):
+        # Removing scores is handled by delete() here and on the queryset, cascade deletes remove the totals too
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = (ActivityScore.objects.select_for_update().filter(pk=self.pk)
+                            .values_list('user_id', 'timestamp', 'change').first())
+            super().save(*args, **kwargs)
+
+            changes = [(self.user_id, self.timestamp, self.change, 1)]
+            if previous is not None:
+                user_id, timestamp, change = previous
+                changes.append((user_id, timestamp, -change, -1))
+            User.change_scores(changes)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if result[0]:
+                User.change_scores([(self.user_id, self.timestamp, -self.change, -1)])
+        return result
+
+
+class DailyActivityScore(models.Model):
+    """
+    Sum of the activity scores of a user from one day (in the local time zone), kept by ActivityScore.
+    """
+    user = models.ForeignKey(User, related_name='daily_activity_scores', on_delete=models.CASCADE)
+    date = models.DateField()
+    total = models.IntegerField(default=0)
+    entries = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'date')
+        indexes = [models.Index(name='daily_activity_score_index', fields=['date', 'user'], include=['total'])]
+
+    def __str__(self):
+        return f"{self.total} POINTS FOR USER {self.user_id} ON {self.date}"
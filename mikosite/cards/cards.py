@@ -1,13 +1,19 @@
-import cairosvg
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from itertools import accumulate
 from io import BytesIO
 from pathlib import Path
 from typing import Optional
 from PIL import Image, ImageDraw, ImageFont
+from PIL.PngImagePlugin import PngInfo
 
 
-FONT_PATH = "mikosite/static/fonts/RubikVariable.ttf"
-LOGO_PATH = "mikosite/static/logoNoCircle.svg"
-TEMPLATE_PATH = "mikosite/media/cards/template.png"
+BASE_DIR = Path(__file__).resolve().parent.parent  # Cards are also rendered by views, from any working directory
+FONT_PATH = str(BASE_DIR / "static/fonts/RubikVariable.ttf")
+LOGO_PATH = str(BASE_DIR / "static/logoNoCircle.svg")
+TEMPLATE_PATH = str(BASE_DIR / "media/cards/template.png")
 CARD_WIDTH = 1200
 CARD_HEIGHT = 630
 BG_COLOR = "#06313e"  # Dark blue from brand identification
@@ -22,6 +28,8 @@ DESC_POS = (50, 75)  # From bottom left
 DESC_MIN_LINES = 3
 DESC_MAX_LINES = 4
 DESC_TITLE_SPACE = 30
+CARD_HASH_KEY = "card-hash"  # PNG text chunk holding the hash of the content a card was rendered from
+CARD_RENDERER_VERSION = 1  # Part of the content hash, increase after changing how cards are drawn
 
 
 def read_svg_to_image(svg_path: str, output_size: tuple[int, int]):
@@ -35,6 +43,8 @@ def read_svg_to_image(svg_path: str, output_size: tuple[int, int]):
     Returns:
         PIL.Image.Image: PNG image created from the SVG file.
     """
+    import cairosvg  # Needs the cairo system library, only required for regenerating the template
+
     with open(svg_path, 'rb') as svg_file:
         svg_content = svg_file.read()
         png_data = cairosvg.svg2png(bytestring=svg_content,
@@ -42,6 +52,34 @@ def read_svg_to_image(svg_path: str, output_size: tuple[int, int]):
         return Image.open(BytesIO(png_data))
 
 
+WORD_WIDTH_CACHE_SIZE = 16384  # Words remembered across all fonts, enough for every card of the site
+
+
+@lru_cache(maxsize=WORD_WIDTH_CACHE_SIZE)
+def _word_width(font: ImageFont.FreeTypeFont, word: str) -> float:
+    # Fonts from get_font live as long as the process, so the cache is bounded by word count instead of by font
+    return font.getlength(word)
+
+
+def measure_words(words: list[str], font: ImageFont.FreeTypeFont):
+    """
+    Measure the words of a text, asking FreeType only about words not seen recently with this font.
+
+    Widths of a line are sums of the widths of its words and spaces: the font has no kerning across spaces,
+    and the widths are multiples of 1/64 px, so the float sums are exact and equal to measuring the whole line.
+
+    Args:
+        words (list[str]): The words to measure.
+        font (ImageFont.FreeTypeFont): The font object used to measure the width of the text.
+
+    Returns:
+        tuple:
+            list[float]: Width of every word.
+            float: Width of a space.
+    """
+    return [_word_width(font, word) for word in words], _word_width(font, ' ')
+
+
 def wrap_description_text(description: str, font: ImageFont.FreeTypeFont, width: int):
     """
     Wrap the description text into multiple lines to fit within a specified width.
@@ -56,15 +94,20 @@ def wrap_description_text(description: str, font: ImageFont.FreeTypeFont, width:
             str: The wrapped text with lines separated by newline characters.
             int: The number of lines in the wrapped text.
     """
+    words = description.split(' ')
+    word_widths, space_width = measure_words(words, font)
     lines = []
-    for word in description.split(' '):
+    line_width = 0
+    for word, word_width in zip(words, word_widths):
         # Try to extend the last line
-        if len(lines) and font.getlength(lines[-1] + ' ' + word) <= width:
-            lines[-1] += ' ' + word
+        if len(lines) and line_width + space_width + word_width <= width:
+            lines[-1].append(word)
+            line_width += space_width + word_width
         else:
             # Create a new line only if necessary
-            lines.append(word)
-    return '\n'.join(lines), len(lines)
+            lines.append([word])
+            line_width = word_width
+    return '\n'.join(' '.join(line) for line in lines), len(lines)
 
 
 def wrap_title_text(title: str, font: ImageFont.FreeTypeFont, width: int):
@@ -85,26 +128,168 @@ def wrap_title_text(title: str, font: ImageFont.FreeTypeFont, width: int):
     Raises:
         ValueError: If the title is too long to fit in two lines.
     """
-    if font.getlength(title) <= width:
+    word_list = title.split(' ')
+    word_widths, space_width = measure_words(word_list, font)
+    # prefix[i] is the width of the first i words together with the spaces after them
+    prefix = list(accumulate((word_width + space_width for word_width in word_widths), initial=0))
+    total_width = prefix[-1] - space_width
+
+    if total_width <= width:
         # No wrapping needed if everything fits in one line
         return title, 1
 
-    word_list = title.split(' ')
     min_width = width + 1
-    out = ""
+    best_pos = 0
 
     # Try every breaking position and find one with minimum width
     for pos in range(1, len(word_list)):
-        line1 = ' '.join(word_list[:pos])
-        line2 = ' '.join(word_list[pos:])
-        this_width = max(font.getlength(line1), font.getlength(line2))
+        this_width = max(prefix[pos] - space_width, total_width - prefix[pos])
         if this_width < min_width:
             min_width = this_width
-            out = line1 + '\n' + line2
+            best_pos = pos
 
     if min_width > width:
         raise ValueError('Title too long.')
-    return out, 2
+    return ' '.join(word_list[:best_pos]) + '\n' + ' '.join(word_list[best_pos:]), 2
+
+
+@lru_cache(maxsize=None)
+def get_font(size: int, variation: Optional[str] = None):
+    """
+    Load the card font, once per process for every size and variation.
+
+    The returned object is shared, so it must not be modified by the caller (e.g. with set_variation_by_name).
+
+    Args:
+        size (int): Font size in pixels.
+        variation (Optional[str]): Name of the variable font instance, e.g. 'Bold'. Default instance if None.
+
+    Returns:
+        ImageFont.FreeTypeFont: The font object.
+    """
+    font = ImageFont.truetype(FONT_PATH, size)
+    if variation is not None:
+        font.set_variation_by_name(variation)
+    return font
+
+
+def read_card_hash(path) -> Optional[str]:
+    """
+    Read the content hash stored in an already rendered card.
+
+    Only the PNG header and the chunks before the image data are read, not the pixels.
+
+    Returns:
+        Optional[str]: The stored hash, None if the file does not exist, is not a card or is broken.
+    """
+    try:
+        with Image.open(path) as card:
+            return card.info.get(CARD_HASH_KEY)
+    except (OSError, ValueError):
+        return None
+
+
+class CardRenderContext:
+    """
+    Process-level state reused between rendered cards.
+
+    The template is read from disk on first use and every card is drawn on an in-memory copy of it.
+    The content hash of a card covers the renderer version, the font, the template and the texts,
+    so a card whose output file already carries the same hash does not have to be drawn again.
+    """
+
+    def __init__(self):
+        self._template = None
+        self._template_digest = None
+        self._font_digest = None
+
+    def reset(self):
+        """
+        Forget the loaded template and font digest, e.g. after the template was regenerated by update_template.
+        """
+        self._template = None
+        self._template_digest = None
+        self._font_digest = None
+
+    def load_template(self, regenerate: bool = True):
+        """
+        Read the template, unless it is already loaded.
+
+        Args:
+            regenerate (bool): Create a missing template with update_template, which requires cairo for the SVG logo.
+
+        Raises:
+            FileNotFoundError: If the template does not exist and regenerate is False.
+        """
+        if self._template is None:
+            self._load_template(regenerate)
+
+    def _load_template(self, regenerate: bool = True):
+        if regenerate and not Path(TEMPLATE_PATH).exists():
+            update_template()
+        template_bytes = Path(TEMPLATE_PATH).read_bytes()
+        with Image.open(BytesIO(template_bytes)) as template:
+            self._template = template.convert('RGB')
+        self._template_digest = hashlib.sha256(template_bytes).hexdigest()
+
+    @property
+    def template(self) -> Image.Image:
+        if self._template is None:
+            self._load_template()
+        return self._template
+
+    @property
+    def template_digest(self) -> str:
+        if self._template_digest is None:
+            self._load_template()
+        return self._template_digest
+
+    @property
+    def font_digest(self) -> str:
+        if self._font_digest is None:
+            self._font_digest = hashlib.sha256(Path(FONT_PATH).read_bytes()).hexdigest()
+        return self._font_digest
+
+    def content_hash(self, title: str, description: str) -> str:
+        """
+        Compute the hash identifying a card with the given texts drawn by this renderer on the current template.
+        """
+        content = '\0'.join((str(CARD_RENDERER_VERSION), self.font_digest, self.template_digest, title, description))
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def render(self, title: str, description: str) -> Image.Image:
+        """
+        Draw a social card on a copy of the template.
+
+        Raises:
+            ValueError: If the title or description is too long.
+        """
+        image = self.template.copy()
+        draw = ImageDraw.Draw(image)
+
+        font_title = get_font(60, 'SemiBold')
+        font_desc = get_font(40)
+
+        description, line_count = wrap_description_text(description, font_desc, width=TEXT_WIDTH)
+        if line_count > DESC_MAX_LINES:
+            raise ValueError('Description too long.')
+
+        desc_box = font_desc.getbbox(description)
+        desc_height = desc_box[3] - desc_box[1]
+        desc_vertical_pos = (CARD_HEIGHT - DESC_POS[1]
+                             - desc_height * min(max(line_count, DESC_MIN_LINES), DESC_MAX_LINES))
+        draw.text((DESC_POS[0], desc_vertical_pos), description, font=font_desc, fill="white")
+
+        title, line_count = wrap_title_text(title, font_title, width=TEXT_WIDTH - 20)
+        title_box = font_title.getbbox(title)
+        title_height = title_box[3] - title_box[1]
+        title_vertical_pos = desc_vertical_pos - DESC_TITLE_SPACE - title_height * (line_count - 1)
+        draw.text((DESC_POS[0], title_vertical_pos), title, font=font_title, fill="white", anchor='ls')
+
+        return image
+
+
+render_context = CardRenderContext()
 
 
 def update_template():
@@ -135,9 +320,8 @@ def update_template():
         logo = Image.open(LOGO_PATH).resize(LOGO_SIZE)
     image.paste(logo, LOGO_POS, logo)
 
-    font_stamp = ImageFont.truetype(FONT_PATH, 90)
-    font_author = ImageFont.truetype(FONT_PATH, 30)
-    font_stamp.set_variation_by_name('Bold')
+    font_stamp = get_font(90, 'Bold')
+    font_author = get_font(30)
 
     draw.text(STAMP_POS, STAMP_TEXT, font=font_stamp, fill="white", anchor='lt')
     stamp_box = font_stamp.getbbox(STAMP_TEXT)
@@ -150,17 +334,69 @@ def update_template():
               AUTHOR_LINE_2, font=font_author, fill="white", anchor='ls')
 
     image.save(TEMPLATE_PATH, "PNG")
+    render_context.reset()
     return TEMPLATE_PATH
 
 
-def render_social_card(title: str, description: str, filename: Optional[str] = None, output_path: Optional[str] = None):
+def render_card_png(title: str, description: str) -> bytes:
+    """
+    Render a social card to PNG data in memory, with its content hash stored in the PNG metadata.
+
+    Args:
+        title (str): The title text to display on the social card.
+        description (str): The description text to display below the title.
+
+    Returns:
+        bytes: The PNG file contents.
+
+    Raises:
+        ValueError: If the title or description is too long.
+    """
+    image = render_context.render(title, description)
+    metadata = PngInfo()
+    metadata.add_text(CARD_HASH_KEY, render_context.content_hash(title, description))
+    buffer = BytesIO()
+    image.save(buffer, "PNG", pnginfo=metadata)
+    return buffer.getvalue()
+
+
+def save_card_png(output_path, png: bytes):
+    """
+    Write a rendered card atomically, so that readers of the path never see a partially written file.
+    """
+    output_dir = Path(output_path).parent
+    with tempfile.NamedTemporaryFile(dir=output_dir, suffix='.tmp', delete=False) as temp_file:
+        temp_file.write(png)
+    try:
+        os.replace(temp_file.name, output_path)
+    except OSError:
+        os.unlink(temp_file.name)
+        raise
+
+
+def card_output_path(filename: str) -> Path:
+    """
+    Path of a card saved by filename in the cards directory.
+    """
+    return Path(TEMPLATE_PATH).parent / filename
+
+
+def is_card_current(title: str, description: str, output_path) -> bool:
+    """
+    Check whether the card at output_path was rendered from the given texts on the current template.
+    """
+    return read_card_hash(output_path) == render_context.content_hash(title, description)
+
+
+def render_social_card(title: str, description: str, filename: Optional[str] = None, output_path: Optional[str] = None,
+                       force: bool = False):
     """
     Render a social media card with a specified title and description on a predefined template.
 
     This function:
-    - Loads an existing template image or refreshes it if needed.
+    - Computes the content hash of the card and skips rendering if the output file already has the same hash.
     - Wraps the title and description text to fit the space.
-    - Draws the wrapped title and description onto the image at specific positions.
+    - Draws the wrapped title and description onto a copy of the cached template.
     - Saves the generated social card as a PNG file in the cards directory or to a specified path.
 
     Args:
@@ -168,6 +404,7 @@ def render_social_card(title: str, description: str, filename: Optional[str] = N
         description (str): The description text to display below the title.
         filename (Optional[str]): The filename used if no output path is provided.
         output_path (Optional[str]): The full path to save the generated image.
+        force (bool): Render the card even if an up-to-date one already exists.
 
     Returns:
         str: The file path of the saved social card image.
@@ -176,33 +413,13 @@ def render_social_card(title: str, description: str, filename: Optional[str] = N
         ValueError: If the title or description is too long.
         ValueError: If neither filename nor output_path is passed to this function.
     """
-    if not Path(TEMPLATE_PATH).exists():
-        update_template()
-    image = Image.open(TEMPLATE_PATH)
-    draw = ImageDraw.Draw(image)
-
-    font_title = ImageFont.truetype(FONT_PATH, 60)
-    font_desc = ImageFont.truetype(FONT_PATH, 40)
-    font_title.set_variation_by_name('SemiBold')
-
-    description, line_count = wrap_description_text(description, font_desc, width=TEXT_WIDTH)
-    if line_count > DESC_MAX_LINES:
-        raise ValueError('Description too long.')
-
-    desc_box = font_desc.getbbox(description)
-    desc_height = desc_box[3] - desc_box[1]
-    desc_vertical_pos = CARD_HEIGHT - DESC_POS[1] - desc_height * min(max(line_count, DESC_MIN_LINES), DESC_MAX_LINES)
-    draw.text((DESC_POS[0], desc_vertical_pos), description, font=font_desc, fill="white")
-
-    title, line_count = wrap_title_text(title, font_title, width=TEXT_WIDTH - 20)
-    title_box = font_title.getbbox(title)
-    title_height = title_box[3] - title_box[1]
-    title_vertical_pos = desc_vertical_pos - DESC_TITLE_SPACE - title_height * (line_count - 1)
-    draw.text((DESC_POS[0], title_vertical_pos), title, font=font_title, fill="white", anchor='ls')
-
     if output_path is None:
         if filename is None:
             raise ValueError('No output path or filename specified.')
-        output_path = Path(TEMPLATE_PATH).parent / filename
-    image.save(output_path, "PNG")
+        output_path = card_output_path(filename)
+
+    if not force and is_card_current(title, description, output_path):
+        return output_path
+
+    save_card_png(output_path, render_card_png(title, description))
     return output_path
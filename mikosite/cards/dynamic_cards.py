@@ -0,0 +1,40 @@
+from babel.dates import format_date, format_time
+from django.conf import settings
+
+from mainSite.models import Post
+from seminars.models import Seminar
+
+
+def post_card(post: Post):
+    """
+    Card of a post: its title and subtitle.
+
+    Returns:
+        tuple: (filename, title, description) in the format of STATIC_CARDS.
+    """
+    return f"post-{post.pk}.png", post.title, post.subtitle
+
+
+def seminar_card(seminar: Seminar, locale=settings.BABEL_LOCALE):
+    """
+    Card of a seminar: its theme, group and start time.
+
+    Returns:
+        tuple: (filename, title, description) in the format of STATIC_CARDS.
+    """
+    when = (f"{format_date(seminar.start_timestamp, format='d MMMM y', locale=locale)}, "
+            f"{format_time(seminar.start_timestamp, format='HH:mm', locale=locale)}")
+    description = f"{seminar.group.name}, {when}" if seminar.group else when
+    return f"seminar-{seminar.pk}.png", seminar.theme, description
+
+
+def dynamic_cards():
+    """
+    Cards of all posts and seminars.
+
+    Returns:
+        list[tuple]: (filename, title, description) for every card, in the format of STATIC_CARDS.
+    """
+    posts = Post.objects.only('pk', 'title', 'subtitle')
+    seminars = Seminar.objects.select_related('group').only('pk', 'theme', 'date', 'time', 'group__name')
+    return [post_card(post) for post in posts] + [seminar_card(seminar) for seminar in seminars]
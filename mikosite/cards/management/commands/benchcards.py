@@ -0,0 +1,44 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from cards.cards import DESC_MAX_LINES, TEXT_WIDTH, get_font, wrap_description_text, wrap_title_text
+
+
+TITLE_WORDS = ["Nierówności", "między", "średnimi", "Wprowadzenie", "do", "teorii", "liczb", "Geometria", "trójkąta",
+               "i", "okręgu", "Kombinatoryka", "zaawansowana", "Równania", "funkcyjne", "Olimpiada", "Matematyczna",
+               "Juniorów", "przygotowanie", "Zasada", "szufladkowa", "Dirichleta", "Wielomiany", "część", "II",
+               "Twierdzenie", "Menelaosa", "Cevy", "Indukcja", "matematyczna", "Grafy", "gry", "kongruencje"]
+DESC_WORDS = ["Dołącz", "do", "nas", "rozwiązuj", "ciekawe", "zadania", "rozwijaj", "z", "nami", "pasję", "do",
+              "matematyki!", "Na", "zajęciach", "omówimy", "najważniejsze", "techniki", "dowodzenia,", "a", "potem",
+              "przećwiczymy", "je", "na", "zadaniach", "z", "ostatnich", "lat.", "Spotkanie", "poprowadzi", "finalista",
+              "OM."]
+
+
+def wrap_card(title, description):
+    try:
+        return wrap_title_text(title, get_font(60, 'SemiBold'), TEXT_WIDTH - 20), \
+            wrap_description_text(description, get_font(40), TEXT_WIDTH)
+    except ValueError as e:
+        return str(e)
+
+
+class Command(BaseCommand):
+    help = 'Measures the cost of wrapping titles and descriptions of social cards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=500, help='Number of wrapped cards')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        corpus = [(' '.join(rng.choices(TITLE_WORDS, k=rng.randint(2, 9))),
+                   ' '.join(rng.choices(DESC_WORDS, k=rng.randint(5, 9 * DESC_MAX_LINES))))
+                  for _ in range(options['cards'])]
+
+        # The first pass measures every word, the second one finds all widths in the cache
+        for name in ("first pass", "cached word widths"):
+            start = perf_counter()
+            for title, description in corpus:
+                wrap_card(title, description)
+            print(f"{name:>20}: {(perf_counter() - start) / len(corpus) * 1000:8.3f} ms per card")
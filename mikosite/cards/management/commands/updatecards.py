@@ -1,16 +1,81 @@
+import os
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from cards.static_cards import STATIC_CARDS
-from cards.cards import render_social_card
+from cards.dynamic_cards import dynamic_cards
+from cards.cards import TEMPLATE_PATH, card_output_path, is_card_current, render_social_card, update_template
+
+
+def render_card(card, force=False):
+    """
+    Render one card in a worker process.
+
+    Returns:
+        tuple: (filename, status, seconds, error) with status 'rendered', 'skipped' or 'failed'.
+    """
+    filename, title, description = card
+    start = time.perf_counter()
+    if not force and is_card_current(title, description, card_output_path(filename)):
+        return filename, 'skipped', time.perf_counter() - start, None
+    try:
+        render_social_card(title, description, filename=filename, force=True)
+    except Exception as e:
+        # One broken card (too long texts, unwritable file, broken font) must not stop the others
+        return filename, 'failed', time.perf_counter() - start, f"{type(e).__name__}: {e}"
+    return filename, 'rendered', time.perf_counter() - start, None
+
+
+def render_card_forced(card):
+    return render_card(card, force=True)
 
 
 class Command(BaseCommand):
-    help = 'Generates static social cards'
-
-    def handle(self, *args, **kwargs):
-        for filename, title, description in tqdm(STATIC_CARDS):
-            try:
-                render_social_card(title, description, filename=filename)
-            except ValueError as e:
-                print(f"ValueError while rendering {filename}: {e}")
-        print("Finished rendering static social cards")
+    help = 'Generates social cards of static pages, posts and seminars'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (default: number of CPUs)')
+        parser.add_argument('--force', action='store_true',
+                            help='Render all cards, not only the ones whose texts or template changed')
+        parser.add_argument('--static-only', action='store_true',
+                            help='Render only the cards of static pages')
+        parser.add_argument('--update-template', action='store_true',
+                            help='Regenerate the template before rendering, e.g. after a logo or font change')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        # Workers would race to create a missing template, so it is always prepared before they start
+        if options['update_template'] or not Path(TEMPLATE_PATH).exists():
+            update_template()
+
+        cards = list(STATIC_CARDS)
+        if not options['static_only']:
+            cards += dynamic_cards()
+
+        worker = render_card_forced if options['force'] else render_card
+        jobs = max(1, min(options['jobs'], len(cards)))
+        if jobs == 1:
+            results = [worker(card) for card in tqdm(cards)]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                chunksize = max(1, len(cards) // (jobs * 4))
+                results = list(tqdm(executor.map(worker, cards, chunksize=chunksize), total=len(cards)))
+
+        rendered = [(filename, seconds) for filename, status, seconds, _ in results if status == 'rendered']
+        skipped = sum(1 for _, status, _, _ in results if status == 'skipped')
+        failed = [(filename, error) for filename, status, _, error in results if status == 'failed']
+        for filename, error in failed:
+            print(f"Rendering {filename} failed with {error}")
+
+        print(f"Finished rendering social cards in {time.perf_counter() - start:.2f}s using {jobs} process(es): "
+              f"{len(rendered)} rendered, {skipped} up to date, {len(failed)} failed")
+        if rendered:
+            render_times = [seconds for _, seconds in rendered]
+            slowest = max(rendered, key=lambda item: item[1])
+            print(f"Render time per card: mean {sum(render_times) / len(render_times) * 1000:.1f}ms, "
+                  f"slowest {slowest[0]} {slowest[1] * 1000:.1f}ms")
+        if failed:
+            raise CommandError(f"{len(failed)} card(s) failed to render")
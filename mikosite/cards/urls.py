@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path("post-<int:post_id>.png", views.post_card_view, name="post_card"),
+    path("seminar-<int:seminar_id>.png", views.seminar_card_view, name="seminar_card"),
+]
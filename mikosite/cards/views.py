@@ -0,0 +1,88 @@
+import os
+
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from cards.cards import card_output_path, read_card_hash, render_card_png, render_context, save_card_png
+from cards.dynamic_cards import post_card, seminar_card
+from mainSite.models import Post
+from seminars.models import Seminar
+
+
+CARD_MAX_AGE = 3600  # Crawlers revalidate after an hour, which is cheap thanks to the ETag
+
+
+def serve_card(request, card):
+    """
+    Serve a social card, rendering and storing it only if the stored one is missing or outdated.
+
+    The ETag is the content hash of the card, so it is known without reading or rendering the image,
+    and a crawler revalidating an unchanged card gets a 304 even if the stored file was removed.
+
+    Args:
+        request (HttpRequest): The request.
+        card (tuple): (filename, title, description) of the card.
+
+    Returns:
+        HttpResponse: The PNG image, or 304 Not Modified.
+
+    Raises:
+        Http404: If the title or description is too long to fit on a card, or the template and the card are missing.
+    """
+    filename, title, description = card
+    output_path = card_output_path(filename)
+    try:
+        # Regenerating the template needs cairo and is left to the updatecards command
+        render_context.load_template(regenerate=False)
+    except FileNotFoundError:
+        return serve_stale_card(output_path)
+
+    content_hash = render_context.content_hash(title, description)
+    etag = quote_etag(content_hash)
+
+    is_current = read_card_hash(output_path) == content_hash
+    last_modified = int(os.path.getmtime(output_path)) if is_current else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if is_current:
+            response = FileResponse(open(output_path, 'rb'), content_type='image/png')
+        else:
+            try:
+                png = render_card_png(title, description)
+            except ValueError as e:
+                raise Http404(f"Card {filename} cannot be rendered: {e}")
+            save_card_png(output_path, png)
+            last_modified = int(os.path.getmtime(output_path))
+            response = HttpResponse(png, content_type='image/png')
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=CARD_MAX_AGE)
+    return response
+
+
+def serve_stale_card(output_path):
+    """
+    Serve the stored card as it is, without validators, while there is no template to check or render it with.
+    """
+    try:
+        response = FileResponse(open(output_path, 'rb'), content_type='image/png')
+    except FileNotFoundError:
+        raise Http404("Card template is missing, run updatecards")
+    patch_cache_control(response, public=True, max_age=CARD_MAX_AGE)
+    return response
+
+
+def post_card_view(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk', 'title', 'subtitle'), pk=post_id)
+    return serve_card(request, post_card(post))
+
+
+def seminar_card_view(request, seminar_id):
+    seminars = Seminar.objects.select_related('group').only('pk', 'theme', 'date', 'time', 'group__name')
+    seminar = get_object_or_404(seminars, pk=seminar_id)
+    return serve_card(request, seminar_card(seminar))
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Problem, ProblemHint, Review
+from .models import Problem, ProblemHint, Review, ProblemRating
 
 
 @admin.register(Problem)
@@ -12,3 +12,4 @@ class ProblemAdmin(admin.ModelAdmin):
 
 admin.site.register(ProblemHint)
 admin.site.register(Review)
+admin.site.register(ProblemRating)
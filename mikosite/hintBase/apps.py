@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class HintbaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hintBase'
+
+    def ready(self):
+        import hintBase.signals
+        from hintBase.search import create_sqlite_search_triggers
+        post_migrate.connect(create_sqlite_search_triggers, sender=self, dispatch_uid='create_sqlite_search_triggers')
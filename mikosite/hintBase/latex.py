@@ -0,0 +1,69 @@
+import re
+
+
+LATEX_DELIMITERS = [
+    "$$", "$", "\\(", "\\)", "\\begin{equation}", "\\end{equation}",
+    "\\begin{align}", "\\end{align}", "\\begin{alignat}", "\\end{alignat}",
+    "\\begin{gather}", "\\end{gather}", "\\begin{CD}", "\\end{CD}",
+    "\\[", "\\]"
+]
+
+# Delimiters are tried in list order, so "$$" wins over "$", whitespace is matched as a separate token
+PREVIEW_TOKEN_RE = re.compile('|'.join(re.escape(delim) for delim in LATEX_DELIMITERS) + r'|(?P<space>\s)')
+
+
+def latex_preview(text: str) -> str:
+    """
+    Shorten a problem statement for the problem list without cutting any LaTeX expression in half.
+
+    Statements up to 125 characters are cut near the 50th character, longer ones near 40% of their length,
+    always at whitespace outside of math mode. The text is scanned once, jumping between delimiters and
+    whitespace with a single regular expression.
+
+    Args:
+        text (str): Problem statement.
+
+    Returns:
+        str: The preview, followed by '...' if anything was cut.
+    """
+    total_length = len(text)
+
+    if total_length <= 50:
+        return text
+
+    if total_length <= 125:
+        target_length = 50
+    else:
+        target_length = int(total_length * 0.4)
+
+    in_latex = False
+    last_space = -1
+    past_target = False
+    position = 0
+    while True:
+        token = PREVIEW_TOKEN_RE.search(text, position)
+        if token is None:
+            break
+        start = token.start()
+        if not past_target and start >= target_length:
+            # Past the target length: stop at the last space before it, unless there was none
+            # or it is inside math mode - then continue until the first space outside of math mode
+            if last_space != -1 and not in_latex:
+                break
+            past_target = True
+
+        if token.group('space') is not None:
+            if not in_latex:
+                last_space = start
+                if past_target:
+                    break
+            position = token.end()
+        elif start > 0 and text[start - 1] == '\\':
+            # Escaped delimiter, e.g. \$ - look for another token starting at the next character
+            position = start + 1
+        else:
+            in_latex = not in_latex
+            position = token.end()
+
+    preview = text[:last_space + 1] if last_space != -1 else text
+    return preview + ('...' if len(preview) < total_length else '')
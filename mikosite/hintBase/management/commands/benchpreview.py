@@ -0,0 +1,43 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from hintBase.latex import latex_preview
+from hintBase.views import PROBLEMS_PER_PAGE
+
+
+FRAGMENTS = ["Udowodnij, że", "dla każdej liczby", "rzeczywistej", "zachodzi nierówność", "$a^2+b^2\\geq 2ab$",
+             "\\[ \\sum_{i=1}^{n} \\frac{x_i^2}{y_i} \\geq \\frac{(x_1+\\dots+x_n)^2}{y_1+\\dots+y_n} \\]",
+             "\\begin{align} f(x+y) &= f(x) + f(y) \\\\ f(xy) &= f(x)f(y) \\end{align}", "gdzie $n \\in \\mathbb{N}$."]
+
+
+class Command(BaseCommand):
+    help = 'Compares the cost of computing problem previews while rendering a page of the problem list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--length', type=int, default=3000, help='Approximate length of a problem statement')
+        parser.add_argument('--pages', type=int, default=20, help='Number of rendered pages')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        corpus = []
+        for _ in range(PROBLEMS_PER_PAGE):
+            statement = ''
+            while len(statement) < options['length']:
+                statement += rng.choice(FRAGMENTS) + ' '
+            corpus.append(statement)
+
+        template = Template("{% for text in texts %}<div>{{ text }}</div>{% endfor %}")
+        stored = [{'preview': latex_preview(text)} for text in corpus]
+
+        variants = [
+            ("filter on render", lambda: template.render(Context({'texts': map(latex_preview, corpus)}))),
+            ("stored preview", lambda: template.render(Context({'texts': [row['preview'] for row in stored]}))),
+        ]
+        for name, render_page in variants:
+            start = perf_counter()
+            for _ in range(options['pages']):
+                render_page()
+            print(f"{name:>20}: {(perf_counter() - start) / options['pages'] * 1000:8.2f} ms per page")
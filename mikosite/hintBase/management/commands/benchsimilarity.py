@@ -0,0 +1,76 @@
+import random
+from time import perf_counter
+
+from tqdm import tqdm
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hintBase.models import Problem, ProblemLSHBucket
+from hintBase.similarity import find_similar_problems, lsh_keys
+
+
+WORDS = ("udowodnij że dla każdej liczby rzeczywistej całkowitej dodatniej wyznacz wszystkie funkcje trójkąt okrąg "
+         "punkt prosta równanie nierówność zachodzi istnieje taki iż oraz kąt bok pole czworokąt wielomian ciąg "
+         "suma iloczyn dzielnik pierwsza parzysta nieparzysta wierzchołek środek styczna cięciwa").split()
+FORMULAS = [r"$a^2+b^2\geq 2ab$", r"$x+y=z$", r"$\frac{a}{b}$", r"$n!$", r"$ABC$", r"$\angle BAC = 90^\circ$",
+            r"$f(x+y)=f(x)+f(y)$", r"$p \mid n^2+1$", r"$k \in \mathbb{N}$", r"$\sum_{i=1}^n a_i$"]
+
+
+SYLLABLES = "ka ro mi te po la wy ne zo ść rz cz sz ły de ba fi gu ja ko".split()
+# Real problem bases share boilerplate but differ in most content words, a small vocabulary alone
+# would make every statement a near-duplicate of every other one
+RARE_WORDS = [''.join(random.Random(i).choices(SYLLABLES, k=3)) for i in range(5000)]
+
+
+def random_statement(rng: random.Random, length: int = 40) -> str:
+    def token():
+        r = rng.random()
+        if r < 0.15:
+            return rng.choice(FORMULAS)
+        if r < 0.5:
+            return rng.choice(WORDS)
+        return rng.choice(RARE_WORDS)
+    return ' '.join(token() for _ in range(length))
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measures duplicate detection latency for growing problem bases (all changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000',
+                            help='Comma-separated problem counts, e.g. 1000,10000,100000')
+        parser.add_argument('--queries', type=int, default=20, help='Number of lookups per size')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        rng = random.Random(42)
+        queries = [random_statement(rng) for _ in range(options['queries'])]
+
+        try:
+            with transaction.atomic():
+                for size in sizes:
+                    self.fill(size, rng)
+                    start = perf_counter()
+                    for query in queries:
+                        find_similar_problems(query)
+                    indexed = (perf_counter() - start) / len(queries)
+                    print(f"{size:>8} problems: indexed lookup {indexed * 1000:8.2f} ms")
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    @staticmethod
+    def fill(size: int, rng: random.Random, batch_size: int = 1000):
+        missing = size - Problem.objects.count()
+        for offset in tqdm(range(0, max(missing, 0), batch_size), desc=f"Generating {size} problems", leave=False):
+            problems = Problem.objects.bulk_create(
+                [Problem(latex_code=random_statement(rng), difficulty=rng.randint(1, 10))
+                 for _ in range(min(batch_size, missing - offset))]
+            )
+            ProblemLSHBucket.objects.bulk_create(
+                [ProblemLSHBucket(problem=problem, key=key) for problem in problems for key in lsh_keys(problem.latex_code)]
+            )
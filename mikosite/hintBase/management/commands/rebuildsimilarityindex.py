@@ -0,0 +1,17 @@
+from tqdm import tqdm
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hintBase.models import Problem
+from hintBase.similarity import index_problem
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the MinHash/LSH index used to detect duplicate problems'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            for problem in tqdm(Problem.objects.only('problem_id', 'latex_code').iterator(),
+                                total=Problem.objects.count()):
+                index_problem(problem)
+        print("Finished rebuilding the similarity index")
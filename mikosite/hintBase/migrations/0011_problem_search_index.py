@@ -0,0 +1,67 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# Keep in sync with the constants in hintBase/search.py
+PG_SEARCH_DOCUMENT = ("to_tsvector('simple', "
+                      "coalesce(\"hintBase_problem\".\"latex_code\", '') || ' ' || "
+                      "coalesce(\"hintBase_problem\".\"source\", ''))")
+SQLITE_FTS_TABLE = 'hintbase_problem_fts'
+
+POSTGRES_FORWARDS = [
+    f'CREATE INDEX hintbase_problem_fts_idx ON "hintBase_problem" USING gin ({PG_SEARCH_DOCUMENT})',
+    'CREATE INDEX hintbase_problem_trgm_idx ON "hintBase_problem" USING gin (latex_code gin_trgm_ops)',
+]
+POSTGRES_BACKWARDS = [
+    'DROP INDEX IF EXISTS hintbase_problem_fts_idx',
+    'DROP INDEX IF EXISTS hintbase_problem_trgm_idx',
+]
+
+SQLITE_FORWARDS = [
+    f"""CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5(
+        latex_code, source, content='hintBase_problem', content_rowid='problem_id', tokenize='unicode61'
+    )""",
+    f"""CREATE TRIGGER {SQLITE_FTS_TABLE}_ai AFTER INSERT ON "hintBase_problem" BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, latex_code, source) VALUES (new.problem_id, new.latex_code, new.source);
+    END""",
+    f"""CREATE TRIGGER {SQLITE_FTS_TABLE}_ad AFTER DELETE ON "hintBase_problem" BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, latex_code, source)
+        VALUES ('delete', old.problem_id, old.latex_code, old.source);
+    END""",
+    f"""CREATE TRIGGER {SQLITE_FTS_TABLE}_au AFTER UPDATE OF latex_code, source ON "hintBase_problem" BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, latex_code, source)
+        VALUES ('delete', old.problem_id, old.latex_code, old.source);
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, latex_code, source) VALUES (new.problem_id, new.latex_code, new.source);
+    END""",
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_BACKWARDS = [
+    f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}',
+]
+
+
+def run_for_vendor(postgres_statements, sqlite_statements):
+    def run(apps, schema_editor):
+        statements = {
+            'postgresql': postgres_statements,
+            'sqlite': sqlite_statements,
+        }.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hintBase', '0010_alter_problem_difficulty'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(run_for_vendor(POSTGRES_FORWARDS, SQLITE_FORWARDS),
+                             run_for_vendor(POSTGRES_BACKWARDS, SQLITE_BACKWARDS)),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:22
+
+import random
+import re
+import struct
+import zlib
+from hashlib import blake2b
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of the hashing in hintBase.similarity at the time of this migration, so that later changes
+# of the module do not change what the migration does. Problems are reindexed with rebuildsimilarityindex.
+SHINGLE_SIZE = 5
+LSH_BANDS = 40
+LSH_ROWS = 3
+LATEX_TOKEN_RE = re.compile(r'\\[A-Za-z]+|\w+|\S')
+_rng = random.Random(2024)
+PERMUTATION_MASKS = [_rng.getrandbits(64) for _ in range(LSH_BANDS * LSH_ROWS)]
+
+
+def lsh_keys(latex_code):
+    text = ' '.join(LATEX_TOKEN_RE.findall(latex_code.lower()))
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = [int.from_bytes(blake2b(shingle.encode(), digest_size=8).digest()) for shingle in shingles]
+    signature = [min(map(mask.__xor__, hashes)) for mask in PERMUTATION_MASKS]
+    return [(band << 32) | zlib.crc32(struct.pack(f'>{LSH_ROWS}Q', *signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+            for band in range(LSH_BANDS)]
+
+
+def build_similarity_index(apps, schema_editor):
+    Problem = apps.get_model('hintBase', 'Problem')
+    ProblemLSHBucket = apps.get_model('hintBase', 'ProblemLSHBucket')
+    for problem in Problem.objects.only('problem_id', 'latex_code').iterator():
+        ProblemLSHBucket.objects.bulk_create(
+            [ProblemLSHBucket(problem_id=problem.problem_id, key=key) for key in lsh_keys(problem.latex_code)]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hintBase', '0011_problem_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProblemLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='hintBase.problem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key'], name='problem_lsh_bucket_index')],
+            },
+        ),
+        migrations.RunPython(build_similarity_index, migrations.RunPython.noop),
+    ]
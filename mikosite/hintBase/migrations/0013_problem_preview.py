@@ -0,0 +1,86 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:42
+
+import re
+
+from django.db import migrations, models
+
+
+# Frozen copy of hintBase.latex at the time of this migration, so that later changes
+# of the module do not change what the migration does. Previews are refreshed whenever a problem is saved.
+LATEX_DELIMITERS = [
+    "$$", "$", "\\(", "\\)", "\\begin{equation}", "\\end{equation}",
+    "\\begin{align}", "\\end{align}", "\\begin{alignat}", "\\end{alignat}",
+    "\\begin{gather}", "\\end{gather}", "\\begin{CD}", "\\end{CD}",
+    "\\[", "\\]"
+]
+
+# Delimiters are tried in list order, so "$$" wins over "$", whitespace is matched as a separate token
+PREVIEW_TOKEN_RE = re.compile('|'.join(re.escape(delim) for delim in LATEX_DELIMITERS) + r'|(?P<space>\s)')
+
+
+def latex_preview(text):
+    total_length = len(text)
+
+    if total_length <= 50:
+        return text
+
+    if total_length <= 125:
+        target_length = 50
+    else:
+        target_length = int(total_length * 0.4)
+
+    in_latex = False
+    last_space = -1
+    past_target = False
+    position = 0
+    while True:
+        token = PREVIEW_TOKEN_RE.search(text, position)
+        if token is None:
+            break
+        start = token.start()
+        if not past_target and start >= target_length:
+            # Past the target length: stop at the last space before it, unless there was none
+            # or it is inside math mode - then continue until the first space outside of math mode
+            if last_space != -1 and not in_latex:
+                break
+            past_target = True
+
+        if token.group('space') is not None:
+            if not in_latex:
+                last_space = start
+                if past_target:
+                    break
+            position = token.end()
+        elif start > 0 and text[start - 1] == '\\':
+            # Escaped delimiter, e.g. \$ - look for another token starting at the next character
+            position = start + 1
+        else:
+            in_latex = not in_latex
+            position = token.end()
+
+    preview = text[:last_space + 1] if last_space != -1 else text
+    return preview + ('...' if len(preview) < total_length else '')
+
+
+def compute_previews(apps, schema_editor):
+    Problem = apps.get_model('hintBase', 'Problem')
+    problems = list(Problem.objects.only('problem_id', 'latex_code'))
+    for problem in problems:
+        problem.preview = latex_preview(problem.latex_code)
+    Problem.objects.bulk_update(problems, ['preview'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hintBase', '0012_problemlshbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='preview',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(compute_previews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_ratings_to_table(apps, schema_editor):
+    Review = apps.get_model('hintBase', 'Review')
+    ProblemRating = apps.get_model('hintBase', 'ProblemRating')
+    User = apps.get_model('accounts', 'User')
+
+    reviews = list(Review.objects.exclude(ratings__isnull=True))
+    usernames = {username for review in reviews for username in review.ratings}
+    user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+
+    ratings = []
+    for review in reviews:
+        values = [int(float(value)) for username, value in review.ratings.items() if username in user_ids]
+        ratings.extend(ProblemRating(review_id=review.id, user_id=user_ids[username], value=int(float(value)))
+                       for username, value in review.ratings.items() if username in user_ids)
+        review.rating_sum = sum(values)
+        review.rating_count = len(values)
+    ProblemRating.objects.bulk_create(ratings, batch_size=500)
+    Review.objects.bulk_update(reviews, ['rating_sum', 'rating_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hintBase', '0013_problem_preview'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ProblemRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.IntegerField()),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_ratings', to='hintBase.review')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('review', 'user')},
+            },
+        ),
+        migrations.RunPython(move_ratings_to_table, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='review',
+            name='ratings',
+        ),
+    ]
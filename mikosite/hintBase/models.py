@@ -1,12 +1,17 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Subquery, Sum
+from django.db.models.functions import Cast, Round
 from accounts.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from taggit.managers import TaggableManager
 
+from .latex import latex_preview
+
 
 class Problem(models.Model):
     problem_id = models.AutoField(primary_key=True)
     latex_code = models.TextField()
+    preview = models.TextField(blank=True, null=True, editable=False)  # Shortened latex_code for problem lists
 
     author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     source = models.CharField(max_length=100, blank=True, null=True)
@@ -20,6 +25,13 @@ class Problem(models.Model):
 
     tags = TaggableManager()
 
+    def save(self, *args, **kwargs):
+        self.preview = latex_preview(self.latex_code)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'latex_code' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'preview'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         if self.author is not None:
             return f'Problem by {self.author.username}, problem id: {self.problem_id}'
@@ -44,33 +56,86 @@ class ProblemHint(models.Model):
 class Review(models.Model):
     current_rating = models.FloatField(blank=True, null=True, default=0)
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE, null=True, blank=True)
-    ratings = models.JSONField(default=dict, blank=True, null=True)
+    rating_sum = models.IntegerField(default=0)  # Running totals of ProblemRating values, kept by add_rating
+    rating_count = models.IntegerField(default=0)
 
     def update_rating(self):
-        new_value = 0
-        amount = len(self.ratings)
-        for rating in self.ratings:
-            new_value += float(self.ratings[rating])
-        new_value = round(new_value / amount, 2)
-        self.current_rating = new_value
-        self.problem.difficulty = new_value
+        """
+        Recalculate the running totals from the stored ratings, e.g. after editing ratings in the admin panel.
+        """
+        totals = self.user_ratings.aggregate(rating_sum=Sum('value'), rating_count=Count('id'))
+        self.rating_sum = totals['rating_sum'] or 0
+        self.rating_count = totals['rating_count']
+        if self.rating_count:
+            self.current_rating = round(self.rating_sum / self.rating_count, 2)
+            self.problem.difficulty = self.current_rating
+            self.problem.save(update_fields=['difficulty'])
         self.save()
-        self.problem.save()
 
-    def add_rating(self, key, value):
+    def add_rating(self, user, value):
+        """
+        Add or change the user's rating and update the running totals in place.
+
+        The totals are changed with F-expressions by the difference between the new and the previous rating,
+        so concurrent votes of different users never overwrite each other and no vote requires reading
+        all the ratings of the problem.
+        """
         if not isinstance(value, int):
-            raise ValueError("Key must be a string and value must be an integer.")
-        if not User.objects.filter(username=key).exists():
-            raise ValueError(f"No User with username '{key}' found.")
+            raise ValueError("Value must be an integer.")
 
-        for rating in self.ratings:
-            if rating == key:
-                self.ratings[rating] = value
-                break
+        def locked_previous():
+            return (ProblemRating.objects.select_for_update()
+                    .filter(review=self, user=user)
+                    .values_list('value', flat=True).first())
 
-        self.ratings[key] = value
-        self.save()
+        with transaction.atomic():
+            previous = locked_previous()
+            if previous is None:
+                try:
+                    with transaction.atomic():
+                        ProblemRating.objects.create(review=self, user=user, value=value)
+                    sum_change, count_change = value, 1
+                except IntegrityError:
+                    # A concurrent first vote of the same user was committed after the lookup, change it instead
+                    previous = locked_previous()
+            if previous is not None:
+                ProblemRating.objects.filter(review=self, user=user).update(value=value)
+                sum_change, count_change = value - previous, 0
+
+            new_sum = F('rating_sum') + sum_change
+            new_count = F('rating_count') + count_change
+            Review.objects.filter(pk=self.pk).update(
+                rating_sum=new_sum,
+                rating_count=new_count,
+                current_rating=Round(Cast(new_sum, models.FloatField()) / new_count, 2),
+            )
+            Problem.objects.filter(pk=self.problem_id).update(
+                difficulty=Subquery(Review.objects.filter(pk=self.pk).values('current_rating')[:1])
+            )
         return "Rating added"
 
     def __str__(self):
         return f'({self.current_rating}) Review for Problem {self.problem.problem_id} by {self.problem.author.username}'
+
+
+class ProblemRating(models.Model):
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='user_ratings')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    value = models.IntegerField()
+
+    class Meta:
+        unique_together = (('review', 'user'),)
+
+    def __str__(self):
+        return f'{self.value} for Problem {self.review.problem_id} by {self.user.username}'
+
+
+class ProblemLSHBucket(models.Model):
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='lsh_buckets')
+    key = models.BigIntegerField()  # band number in the upper bits, hash of the band's MinHash rows in the lower
+
+    class Meta:
+        indexes = [models.Index(name='problem_lsh_bucket_index', fields=['key'])]
+
+    def __str__(self):
+        return f'LSH bucket {self.key} of Problem {self.problem_id}'
@@ -0,0 +1,56 @@
+from typing import Optional
+
+from django.db.models import Q, QuerySet
+
+
+def _parse_cursor(cursor: Optional[str], ranked: bool):
+    try:
+        if ranked:
+            rank, problem_id = cursor.split(':')
+            return float(rank), int(problem_id)
+        return None, int(cursor)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def keyset_page(queryset: QuerySet, cursor: Optional[str], page_size: int):
+    """
+    Fetch one page of problems following the given cursor.
+
+    Pages are ordered by `problem_id` descending, or by (`search_rank`, `problem_id`) descending when the queryset
+    comes from `search_problems` (which annotates the rank as a double precision value, so the `repr` stored in the
+    cursor is compared exactly against rows tied with the last one). Instead of an OFFSET the page starts right after
+    the last row of the previous page, so every page is a single indexed query fetching `page_size + 1` rows no matter
+    how deep it is.
+
+    Args:
+        queryset (QuerySet): Problems to paginate, already filtered.
+        cursor (Optional[str]): Cursor returned with the previous page, None (or an invalid value) for the first page.
+        page_size (int): Number of problems per page.
+
+    Returns:
+        tuple:
+            list[Problem]: Problems on the page.
+            Optional[str]: Cursor of the next page, None if this is the last one.
+    """
+    ranked = 'search_rank' in queryset.query.annotations
+    position = _parse_cursor(cursor, ranked)
+
+    if ranked:
+        queryset = queryset.order_by('-search_rank', '-problem_id')
+        if position is not None:
+            rank, problem_id = position
+            queryset = queryset.filter(Q(search_rank__lt=rank) | Q(search_rank=rank, problem_id__lt=problem_id))
+    else:
+        queryset = queryset.order_by('-problem_id')
+        if position is not None:
+            queryset = queryset.filter(problem_id__lt=position[1])
+
+    problems = list(queryset[:page_size + 1])
+    if len(problems) <= page_size:
+        return problems, None
+
+    problems = problems[:page_size]
+    last = problems[-1]
+    next_cursor = f'{last.search_rank!r}:{last.problem_id}' if ranked else str(last.problem_id)
+    return problems, next_cursor
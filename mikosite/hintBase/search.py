@@ -0,0 +1,143 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Count, F, FloatField, Q, QuerySet, Value
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.expressions import RawSQL
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField, TrigramWordSimilarity
+from taggit.models import TaggedItem
+
+from .models import Problem
+
+
+# Postgres: expression GIN index on the document below plus a trigram GIN index on `latex_code`.
+# The expression has to match the indexed one exactly, otherwise the planner falls back to a seq scan.
+PG_SEARCH_CONFIG = 'simple'
+PG_SEARCH_DOCUMENT = (f"to_tsvector('{PG_SEARCH_CONFIG}', "
+                      "coalesce(\"hintBase_problem\".\"latex_code\", '') || ' ' || "
+                      "coalesce(\"hintBase_problem\".\"source\", ''))")
+
+# SQLite: external-content FTS5 table kept in sync with `hintBase_problem` by triggers (see migration 0011).
+# Migrations that make Django rebuild `hintBase_problem` on SQLite drop the triggers, they are created again
+# after every migrate by `create_sqlite_search_triggers`.
+SQLITE_FTS_TABLE = 'hintbase_problem_fts'
+SQLITE_FTS_TRIGGERS = {
+    f'{SQLITE_FTS_TABLE}_ai': f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ai
+    AFTER INSERT ON "hintBase_problem" BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, latex_code, source) VALUES (new.problem_id, new.latex_code, new.source);
+    END""",
+    f'{SQLITE_FTS_TABLE}_ad': f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ad
+    AFTER DELETE ON "hintBase_problem" BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, latex_code, source)
+        VALUES ('delete', old.problem_id, old.latex_code, old.source);
+    END""",
+    f'{SQLITE_FTS_TABLE}_au': f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_au
+    AFTER UPDATE OF latex_code, source ON "hintBase_problem" BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, latex_code, source)
+        VALUES ('delete', old.problem_id, old.latex_code, old.source);
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, latex_code, source) VALUES (new.problem_id, new.latex_code, new.source);
+    END""",
+}
+
+
+def _fts5_query(phrase: str) -> str:
+    # Quote every token so that LaTeX punctuation is not parsed as FTS5 syntax, allow prefix on the last one
+    tokens = ['"' + token.replace('"', '""') + '"' for token in phrase.split()]
+    if tokens:
+        tokens[-1] += '*'
+    return ' '.join(tokens)
+
+
+def create_sqlite_search_triggers(using: str = DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Create the triggers keeping the SQLite search index in sync, if any of them is missing.
+
+    Connected to `post_migrate`, since SQLite migrations which rebuild `hintBase_problem` drop its triggers.
+    The index is rebuilt afterwards, as rows changed without the triggers are out of date in it.
+    Does nothing on other databases or before migration 0011 created the index.
+
+    Args:
+        using (str): Alias of the migrated database.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or SQLITE_FTS_TABLE not in connection.introspection.table_names():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'hintBase_problem'")
+        existing = {name for name, in cursor.fetchall()}
+        missing = [name for name in SQLITE_FTS_TRIGGERS if name not in existing]
+        if not missing:
+            return
+        for name in missing:
+            cursor.execute(SQLITE_FTS_TRIGGERS[name])
+        cursor.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+
+
+def search_problems(queryset: QuerySet, phrase: str) -> QuerySet:
+    """
+    Filter problems matching the phrase in `latex_code` or `source` and order them by relevance.
+
+    Matching and ranking are done by the database using the search index created in migration 0011,
+    so the returned queryset can be sliced or paginated without loading the whole table.
+
+    Args:
+        queryset (QuerySet): Problems to search in.
+        phrase (str): Phrase typed by the user.
+
+    Returns:
+        QuerySet: Matching problems annotated with `search_rank`, best matches first.
+    """
+    phrase = phrase.strip()
+    if not phrase:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(phrase, config=PG_SEARCH_CONFIG, search_type='websearch')
+        document = RawSQL(PG_SEARCH_DOCUMENT, [], output_field=SearchVectorField())
+        return (queryset.annotate(search_document=document)
+                .filter(Q(search_document=query) | Q(latex_code__contains=phrase))
+                # ts_rank() returns a real, widen it so the rank read back into a pagination cursor compares equal
+                .annotate(search_rank=Cast(SearchRank(F('search_document'), query)
+                                           + TrigramWordSimilarity(phrase, 'latex_code'), FloatField()))
+                .order_by('-search_rank', '-problem_id'))
+
+    if connection.vendor == 'sqlite':
+        fts_query = _fts5_query(phrase)
+        matches = RawSQL(f"SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s", [fts_query])
+        # bm25() is lower for better matches, negate it to keep the descending order used above
+        rank = RawSQL(f"SELECT -bm25({SQLITE_FTS_TABLE}) FROM {SQLITE_FTS_TABLE} "
+                      f"WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid = \"hintBase_problem\".\"problem_id\"",
+                      [fts_query], output_field=FloatField())
+        # Substrings inside words are matched like on Postgres, rows found only this way go after the ranked ones
+        return (queryset.filter(Q(problem_id__in=matches) | Q(latex_code__contains=phrase))
+                .annotate(search_rank=Coalesce(rank, Value(0.0)))
+                .order_by('-search_rank', '-problem_id'))
+
+    return queryset.filter(Q(latex_code__contains=phrase) | Q(source__contains=phrase)).order_by('-problem_id')
+
+
+def filter_problems_by_tags(queryset: QuerySet, tag_names) -> QuerySet:
+    """
+    Keep only problems tagged with all the given tags.
+
+    The intersection is computed in a single subquery over taggit's through table
+    (group by problem, having count of matching tags equal to the number of requested tags).
+
+    Args:
+        queryset (QuerySet): Problems to filter.
+        tag_names (Iterable[str]): Names of the required tags.
+
+    Returns:
+        QuerySet: Filtered problems, the ordering and annotations of `queryset` are preserved.
+    """
+    tag_names = set(tag_names)
+    if not tag_names:
+        return queryset
+
+    tagged_with_all = (TaggedItem.objects
+                       .filter(content_type=ContentType.objects.get_for_model(Problem), tag__name__in=tag_names)
+                       .values('object_id')
+                       .annotate(matched_tags=Count('tag', distinct=True))
+                       .filter(matched_tags=len(tag_names))
+                       .values('object_id'))
+    return queryset.filter(problem_id__in=tagged_with_all)
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Problem, ProblemHint, Review
+from .similarity import index_problem
+
+
+PROBLEM_DETAIL_CACHE_KEY = 'hintbase-problem-{}-display-data'
+PROBLEM_DETAIL_MAX_TTL = 86400  # 1 day
+
+
+def clear_problem_detail_cache(problem_id):
+    cache.delete(PROBLEM_DETAIL_CACHE_KEY.format(problem_id))
+
+
+@receiver(post_save, sender=Problem)
+def update_similarity_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'latex_code' in update_fields:
+        index_problem(instance)
+
+
+@receiver(post_save, sender=Problem)
+@receiver(post_delete, sender=Problem)
+def clear_problem_cache(sender, instance, **kwargs):
+    clear_problem_detail_cache(instance.problem_id)
+
+
+@receiver(m2m_changed, sender=Problem.tags.through)
+def clear_problem_tags_cache(sender, instance, **kwargs):
+    # Tagged items of all models share one table, only tags of problems are cached here
+    if isinstance(instance, Problem):
+        clear_problem_detail_cache(instance.problem_id)
+
+
+@receiver(post_save, sender=ProblemHint)
+@receiver(post_delete, sender=ProblemHint)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def clear_problem_related_cache(sender, instance, **kwargs):
+    if instance.problem_id is not None:
+        clear_problem_detail_cache(instance.problem_id)
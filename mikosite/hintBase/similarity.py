@@ -0,0 +1,112 @@
+import re
+import random
+import struct
+import zlib
+from hashlib import blake2b
+
+from django.db.models import Count
+from fuzzywuzzy import fuzz
+
+from .models import Problem, ProblemLSHBucket
+
+
+SIMILARITY_THRESHOLD = 64  # fuzz.ratio above which problems are reported as possible duplicates
+SHINGLE_SIZE = 5  # characters
+# 80 bands of 3 rows put the LSH threshold around Jaccard similarity 0.23. In generated pairs of statements with
+# `fuzz.ratio` above SIMILARITY_THRESHOLD the shingle Jaccard similarity was at least 0.22, so a duplicate shares
+# no bucket with probability 0.1% on average and 40% in the worst case (0.7% and 64% with 40 bands of 3 rows).
+LSH_BANDS = 80
+LSH_ROWS = 3
+NUM_PERMUTATIONS = LSH_BANDS * LSH_ROWS
+# Candidates colliding in the most bands are scored. Duplicates mostly collide in 3 or more bands, unrelated problems
+# with shared boilerplate mostly in one: in 100k generated problems (see benchsimilarity) 0 of 500 duplicates
+# and 1 of 300 duplicates scoring 65-75 were ranked below the cap.
+MAX_CANDIDATES = 200
+
+_rng = random.Random(2024)  # fixed seed, signatures have to be stable between processes and deployments
+_PERMUTATION_MASKS = [_rng.getrandbits(64) for _ in range(NUM_PERMUTATIONS)]
+
+LATEX_TOKEN_RE = re.compile(r'\\[A-Za-z]+|\w+|\S')
+
+
+def shingles(latex_code: str) -> set[str]:
+    """
+    Split the problem statement into overlapping character shingles.
+
+    The text is first tokenized as LaTeX (commands, words and single symbols) and joined back with
+    single spaces, so that formatting differences like `a+b` and `a + b` do not affect the result.
+
+    Args:
+        latex_code (str): Problem statement.
+
+    Returns:
+        set[str]: Shingles of length SHINGLE_SIZE (or the whole normalized text if it is shorter).
+    """
+    text = ' '.join(LATEX_TOKEN_RE.findall(latex_code.lower()))
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(latex_code: str) -> list[int]:
+    """
+    Compute the MinHash signature of the problem statement.
+
+    Returns:
+        list[int]: NUM_PERMUTATIONS minimal hash values, one per permutation.
+    """
+    # XOR with a random mask permutes the 64-bit hash space, map() keeps the inner loop in C
+    hashes = [int.from_bytes(blake2b(shingle.encode(), digest_size=8).digest()) for shingle in shingles(latex_code)]
+    return [min(map(mask.__xor__, hashes)) for mask in _PERMUTATION_MASKS]
+
+
+def lsh_keys(latex_code: str) -> list[int]:
+    """
+    Compute LSH bucket keys of the problem statement, one per band.
+
+    Each key packs the band number into the upper bits, so keys of all bands can live in one indexed column.
+
+    Returns:
+        list[int]: LSH_BANDS bucket keys.
+    """
+    signature = minhash_signature(latex_code)
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        keys.append((band << 32) | zlib.crc32(struct.pack(f'>{LSH_ROWS}Q', *rows)))
+    return keys
+
+
+def index_problem(problem: Problem):
+    """
+    Replace the LSH buckets of a saved problem with ones computed from its current statement.
+    """
+    ProblemLSHBucket.objects.filter(problem=problem).delete()
+    ProblemLSHBucket.objects.bulk_create(
+        [ProblemLSHBucket(problem=problem, key=key) for key in lsh_keys(problem.latex_code)]
+    )
+
+
+def find_similar_problems(latex_code: str, threshold: int = SIMILARITY_THRESHOLD) -> list[Problem]:
+    """
+    Find problems whose statement is similar to the given one.
+
+    Candidates sharing at least one LSH bucket are fetched from the index (at most MAX_CANDIDATES of them,
+    the ones colliding in the most bands) and only those are scored with `fuzz.ratio`. This is approximate:
+    a duplicate near the threshold is missed when it shares no bucket or when more than MAX_CANDIDATES problems
+    collide with the statement more often than it does (see the recall measured next to the constants).
+
+    Args:
+        latex_code (str): Statement of the problem being added.
+        threshold (int): Minimal `fuzz.ratio` for a problem to be reported.
+
+    Returns:
+        list[Problem]: Similar problems ordered by id.
+    """
+    candidate_ids = (ProblemLSHBucket.objects.filter(key__in=lsh_keys(latex_code))
+                     .values('problem')
+                     .annotate(hits=Count('id'))
+                     .order_by('-hits')
+                     .values_list('problem', flat=True)[:MAX_CANDIDATES])
+    candidates = Problem.objects.filter(problem_id__in=list(candidate_ids)).order_by('problem_id')
+    return [problem for problem in candidates if fuzz.ratio(problem.latex_code, latex_code) > threshold]
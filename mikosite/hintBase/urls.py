@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("problems/", views.problem_list, name="problem_list"),
     path("addproblem/", views.addproblem, name="addproblem"),
     path("view_problem/<int:problem_id>/", views.view_problem, name="view_problem"),
     path("view_problem/<int:problem_id>/add_solution/", views.add_solution, name="add_solution"),
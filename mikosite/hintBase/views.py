@@ -1,63 +1,78 @@
 from django.shortcuts import render, HttpResponse
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from .models import Problem, ProblemHint, Review
 from taggit.models import Tag
-from fuzzywuzzy import fuzz
 from datetime import datetime
 from pytz import timezone
 from django.db.models import Q
+from urllib.parse import urlencode
+from .search import search_problems, filter_problems_by_tags
+from .pagination import keyset_page
+from .similarity import find_similar_problems
+from .signals import PROBLEM_DETAIL_CACHE_KEY, PROBLEM_DETAIL_MAX_TTL, clear_problem_detail_cache
+
+
+PROBLEMS_PER_PAGE = 20
+FILTER_PARAMS = ('tags_to_filter', 'difficulty', 'search')
+
+
+def get_filtered_problems(params):
+    filtered_problems = Problem.objects.select_related('author').prefetch_related('tags').defer('latex_code')
+
+    tags_to_filter = set(params.getlist('tags_to_filter'))
+    diffStr = params.get('difficulty', '')
+    search = params.get('search', '').strip()
+
+    if len(diffStr) != 0:
+        ranges = [int(x) for x in diffStr.split(',')]
+        query = Q()
+
+        for value in ranges:
+            query |= Q(difficulty__gte=value, difficulty__lt=value + 1)
+        filtered_problems = filtered_problems.filter(query)
+    if search != "":
+        filtered_problems = search_problems(filtered_problems, search)
+    if tags_to_filter:
+        filtered_problems = filter_problems_by_tags(filtered_problems, tags_to_filter)
+
+    return filtered_problems
+
+
+def get_problem_page(params):
+    problems, next_cursor = keyset_page(get_filtered_problems(params), params.get('after'), PROBLEMS_PER_PAGE)
+    filter_query = urlencode([(key, value) for key in FILTER_PARAMS for value in params.getlist(key)])
+    return {
+        "all_problems": problems,
+        "filter_query": filter_query,
+        "next_cursor": next_cursor,
+    }
 
 
 # @cache_page(60*5)
 def index(request):
-    # Retrieve all problems in reverse order
-    all_problems = reversed(Problem.objects.all())
-
     # Check if the user belongs to the 'Moderator' group
     user_belongs_to_moderator_group = request.user.groups.filter(name='Moderator').exists()
 
     # Get all tag names
     tags = [tag.name for tag in Tag.objects.all()]
 
-    if request.method == 'POST':
-        tags_to_filter = set(request.POST.getlist('tags_to_filter'))
-        diffStr = str(request.POST.get('difficulty'))
-        search = str(request.POST.get("search"))
-
-        if len(diffStr) != 0:
-            ranges = [int(x) for x in diffStr.split(',')]
-            query = Q()
-
-            for value in ranges:
-                query |= Q(difficulty__gte=value, difficulty__lt=value + 1)
-            filtered_problems = reversed(Problem.objects.filter(query))
-        else:
-            filtered_problems = all_problems
-        if tags_to_filter:
-            filtered_problems = [
-                problem for problem in filtered_problems
-                if tags_to_filter.issubset(set(problem.tags.names()))
-            ]
-        if search != "":
-            filtered_problems = [
-                problem for problem in filtered_problems
-                if search in problem.latex_code
-            ]
-
-        return render(request, 'index1.html', {
-            "all_problems": filtered_problems,
-            "user_belongs_to_moderator_group": user_belongs_to_moderator_group,
-            "tags": tags
-        })
+    # Filters are submitted with the search form (POST) and carried over to other pages in the query string (GET)
+    params = request.POST if request.method == 'POST' else request.GET
 
     return render(request, 'index1.html', {
-        "all_problems": all_problems,
+        **get_problem_page(params),
         "user_belongs_to_moderator_group": user_belongs_to_moderator_group,
         "tags": tags
     })
 
 
+# Problem list fragment: next page of the index rendered without the layout, used for infinite scrolling
+def problem_list(request):
+    return render(request, 'problem_list.html', get_problem_page(request.GET))
+
+
 # Add Problem view: Allows authenticated users to add a new problem
 @login_required(login_url='../../signin')
 def addproblem(request):
@@ -110,10 +125,7 @@ def addproblem(request):
                         "confirm_key": "False",
                         "tags": tags
                     })
-            similar_problems = [
-                selected_Problem for selected_Problem in Problem.objects.all()
-                if fuzz.ratio(selected_Problem.latex_code, latex_code) > 64
-            ]
+            similar_problems = find_similar_problems(latex_code or "")
             if similar_problems:
                 return render(request, 'addproblem.html', {
                     "tags": tags,
@@ -149,17 +161,35 @@ def addproblem(request):
     })
 
 
+def get_problem_detail_data(problem_id):
+    """
+    Problem, its verified hints and current rating, cached per problem until any of them changes.
+
+    Raises:
+        Http404: If there is no problem with the given id.
+    """
+    cache_key = PROBLEM_DETAIL_CACHE_KEY.format(problem_id)
+    data = cache.get(cache_key)
+    if data is None:
+        problem = get_object_or_404(Problem.objects.select_related('author'), problem_id=problem_id)
+        rating = Review.objects.filter(problem=problem).values_list('current_rating', flat=True).first()
+        data = {
+            "problem": problem,
+            "tag_names": list(problem.tags.names()),
+            "hinty": list(ProblemHint.objects.filter(problem=problem, verified=True).select_related('author')),
+            # Problems nobody has rated yet have no Review, their rating is the difficulty set by the author
+            "rating": problem.difficulty if rating is None else rating,
+        }
+        cache.set(cache_key, data, PROBLEM_DETAIL_MAX_TTL)
+
+    return data
+
+
 # View Problem view: Displays a specific problem and its hints
 def view_problem(request, problem_id):
-    problem = get_object_or_404(Problem, problem_id=problem_id)
     assert isinstance(problem_id, int)
-
-    hinty = ProblemHint.objects.filter(problem=problem, verified=True)
-    try:
-        reviews = Review.objects.get(problem=problem, )
-    except:
-        reviews = Review(current_rating=problem.difficulty, problem=problem)
-        reviews.save()
+    data = get_problem_detail_data(problem_id)
+    problem = data["problem"]
 
     is_admin = request.user.is_superuser
 
@@ -174,15 +204,17 @@ def view_problem(request, problem_id):
                     proposed = int(request.POST.get("difficulty"))
                 except:
                     return HttpResponse("Difficuty must be an integer")
-                reviews.add_rating(request.user.username, proposed)
-                reviews.update_rating()
+                reviews, _ = Review.objects.get_or_create(problem=problem,
+                                                          defaults={"current_rating": problem.difficulty})
+                reviews.add_rating(request.user, proposed)
+                # add_rating updates the totals with a queryset update, which sends no signals
+                clear_problem_detail_cache(problem_id)
+                data = get_problem_detail_data(problem_id)
 
     return render(request, 'viewproblem.html', {
-        "problem": problem,
+        **data,
         "user": request.user,
-        "hinty": hinty,
         "is_admin": is_admin,
-        "rating": reviews.current_rating
     })
 
 
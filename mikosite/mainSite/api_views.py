@@ -1,13 +1,22 @@
-from rest_framework import viewsets
+from django.db.models import Prefetch
+from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
 from django_filters import rest_framework as filters
 from django_filters import UnknownFieldBehavior
 
+from accounts.models import USER_DISPLAY_VERSION, User
+from mikosite.versioning import ConditionalGetMixin
+from .changes import ExpiredToken, get_changes, parse_cursor_token, parse_token
 from .models import Post, Image
 from .serializers import PostSerializer, DisplayPostSerializer, PostImageSerializer
 
 
-class PostImageViewSet(viewsets.ModelViewSet):
+class PostImageViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Image.objects.all()
+    version_models = (Image,)
     serializer_class = PostImageSerializer
 
 
@@ -21,18 +30,55 @@ class PostFilter(filters.FilterSet):
         fields = []
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Post.objects.all()
+    version_models = (Post, Image, USER_DISPLAY_VERSION)
+    cursor_ordering = ('-date', '-time', '-id')
     serializer_class = PostSerializer
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = PostFilter
 
+    def is_response_cacheable(self, request):
+        return self.action == 'list' and bool(request.query_params.get('display_only'))
+
     def get_queryset(self):
+        # Fetch everything the chosen serializer touches, so a page costs the same number of queries at any size
         display_only = self.request.query_params.get('display_only', None)
-        return Post.objects.all().prefetch_related('authors', 'images') if display_only else self.queryset
+        if display_only:
+            authors = Prefetch('authors', queryset=User.objects.only('id', 'name', 'surname'))
+            return Post.objects.all().prefetch_related(authors, 'images')
+        return self.queryset.prefetch_related(Prefetch('authors', queryset=User.objects.only('id')),
+                                              Prefetch('images', queryset=Image.objects.only('id')))
 
     def get_serializer_class(self):
         if self.action not in ['list', 'retrieve']:
             return self.serializer_class
         display_only = self.request.query_params.get('display_only', None)
         return DisplayPostSerializer if display_only else self.serializer_class
+
+
+class ChangeFeedViewSet(GenericViewSet):
+    """
+    Seminars, seminar groups, posts and reminders changed or deleted since `?since=<token>`.
+
+    Every response has a `token` to pass as `since` in the next request. While `more` is true the response
+    is one page of a sync and the token fetches the next page, the last page gives the token of the next sync.
+    Without `since` all rows are returned. Changes close to the token may be returned again,
+    so clients have to apply them idempotently.
+    """
+    permission_classes = (IsAdminUser,)
+    pagination_class = None  # Paged by get_changes, over all feeds at once
+
+    def list(self, request):
+        since = request.query_params.get('since')
+        try:
+            if since and '.' in since:
+                changes = get_changes(None, cursor=parse_cursor_token(since))
+            else:
+                changes = get_changes(parse_token(since) if since else None)
+        except ValueError:
+            raise ValidationError({'since': "Invalid token."})
+        except ExpiredToken:
+            return Response({'detail': "The token has expired, synchronize all rows again without `since`."},
+                            status=status.HTTP_410_GONE)
+        return Response(changes)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class MainsiteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mainSite'
+
+    def ready(self):
+        import mainSite.changes
+        from mikosite.versioning import connect_version_receivers
+        # Defining the viewsets registers their version_models
+        import accounts.api_views, mainSite.api_views, seminars.api_views  # noqa: E401
+        connect_version_receivers()
@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
+
+from django.db.models import Prefetch, Q
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import User
+from mainSite.models import Image, Post, Tombstone
+from mainSite.serializers import PostSerializer
+from seminars.models import Reminder, Seminar, SeminarGroup
+from seminars.serializers import RemindersSerializer, SeminarGroupSerializer, SeminarSerializer
+
+
+# Rows are selected from a bit before the token, so that rows saved by transactions which were still running
+# when the token was issued are not missed. Clients receive such rows twice and must apply changes idempotently.
+CHANGES_OVERLAP = timedelta(minutes=1)
+TOMBSTONE_RETENTION = timedelta(days=90)  # Older tokens require a full sync
+CHANGES_PAGE_SIZE = 500  # Rows and tombstones returned in one response, the rest is fetched with `more`
+
+CHANGE_FEEDS = {
+    'seminars': (Seminar, SeminarSerializer,
+                 lambda queryset: queryset.prefetch_related(Prefetch('tutors', queryset=User.objects.only('id')))),
+    'seminar_groups': (SeminarGroup, SeminarGroupSerializer, lambda queryset: queryset),
+    'posts': (Post, PostSerializer,
+              lambda queryset: queryset.prefetch_related(Prefetch('authors', queryset=User.objects.only('id')),
+                                                         Prefetch('images', queryset=Image.objects.only('id')))),
+    'reminders': (Reminder, RemindersSerializer, lambda queryset: queryset),
+}
+FEED_NAMES = {model: name for name, (model, _, _) in CHANGE_FEEDS.items()}
+DELETED_FEED = 'deleted'  # Tombstones, paged after the rows of all feeds
+
+
+class ExpiredToken(Exception):
+    pass
+
+
+def make_token(moment: datetime) -> str:
+    # Microseconds since the epoch, safe to put in a URL as is
+    return str(int(moment.timestamp()) * 1_000_000 + moment.microsecond)
+
+
+def parse_token(token: str) -> datetime:
+    microseconds = int(token)
+    return datetime.fromtimestamp(microseconds // 1_000_000, tz=dt_timezone.utc).replace(
+        microsecond=microseconds % 1_000_000)
+
+
+def make_cursor_token(cursor: tuple) -> str:
+    """
+    Encode (since, started, feed, last time, last pk) of an unfinished sync as a token, with empty fields for None.
+    """
+    since, started, feed, last_time, last_pk = cursor
+    return '.'.join(('' if since is None else make_token(since), make_token(started), feed,
+                     '' if last_time is None else make_token(last_time), '' if last_pk is None else str(last_pk)))
+
+
+def parse_cursor_token(token: str) -> tuple:
+    """
+    Decode a token of make_cursor_token.
+
+    Raises:
+        ValueError: The token is malformed.
+    """
+    since, started, feed, last_time, last_pk = token.split('.')
+    if feed not in CHANGE_FEEDS and feed != DELETED_FEED:
+        raise ValueError(f"Unknown feed {feed}")
+    return (parse_token(since) if since else None, parse_token(started), feed,
+            parse_token(last_time) if last_time else None, int(last_pk) if last_pk else None)
+
+
+def get_changes(since: Optional[datetime], cursor: Optional[tuple] = None, limit: Optional[int] = None) -> dict:
+    """
+    Get a page of the rows of the synchronized models changed since a token of a previous sync.
+
+    The feeds are read one after another, each in the order of (`updated_at`, pk), so that a page is a range scan
+    starting where the previous page ended. A row saved again while the pages are fetched moves to the end of its
+    feed, or is returned by the next sync, which starts at the time the first page was requested.
+
+    Args:
+        since (Optional[datetime]): Parsed token of a finished sync, None to get all rows.
+        cursor (Optional[tuple]): Parsed `token` of the previous page of an unfinished sync,
+            which replaces `since`.
+        limit (Optional[int]): Maximal number of rows and tombstones in the page, CHANGES_PAGE_SIZE by default.
+
+    Returns:
+        dict: Serialized changed rows by feed name, ids of deleted rows by feed name under `deleted` and `more`.
+            If `more` is true, `token` continues this sync, otherwise it starts the next one.
+
+    Raises:
+        ExpiredToken: The token is older than the kept tombstones, the client has to sync all rows again.
+    """
+    if cursor is None:
+        started, feed, last_time, last_pk = timezone.now(), None, None, None
+    else:
+        since, started, feed, last_time, last_pk = cursor
+    if since is not None and since < timezone.now() - TOMBSTONE_RETENTION:
+        raise ExpiredToken()
+
+    feeds = list(CHANGE_FEEDS) + ([DELETED_FEED] if since is not None else [])
+    changes = {name: [] for name in CHANGE_FEEDS}
+    changes['deleted'] = {name: [] for name in CHANGE_FEEDS}
+    remaining = limit or CHANGES_PAGE_SIZE
+    for name in feeds[feeds.index(feed) if feed is not None else 0:]:
+        if name == DELETED_FEED:
+            queryset, time_field = Tombstone.objects.all(), 'deleted_at'
+        else:
+            model, serializer_class, prefetch = CHANGE_FEEDS[name]
+            queryset, time_field = prefetch(model.objects.all()), 'updated_at'
+        queryset = queryset.order_by(time_field, 'pk')
+        if since is not None:
+            queryset = queryset.filter(**{f'{time_field}__gte': since - CHANGES_OVERLAP})
+        if name == feed and last_time is not None:
+            queryset = queryset.filter(Q(**{f'{time_field}__gt': last_time})
+                                       | Q(**{time_field: last_time, 'pk__gt': last_pk}))
+
+        rows = list(queryset[:remaining + 1])  # One more row tells if the feed continues on the next page
+        page = rows[:remaining]
+        if name == DELETED_FEED:
+            for tombstone in page:
+                changes['deleted'][tombstone.model].append(tombstone.object_id)
+        else:
+            changes[name] = serializer_class(page, many=True).data
+        remaining -= len(page)
+
+        if len(rows) > len(page):
+            if page:
+                last_time, last_pk = getattr(page[-1], time_field), page[-1].pk
+            elif name != feed:
+                last_time, last_pk = None, None
+            changes['token'] = make_cursor_token((since, started, name, last_time, last_pk))
+            changes['more'] = True
+            return changes
+
+    changes['token'] = make_token(started)
+    changes['more'] = False
+    return changes
+
+
+@receiver(post_delete, sender=Seminar)
+@receiver(post_delete, sender=SeminarGroup)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Reminder)
+def create_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(model=FEED_NAMES[sender], object_id=instance.pk)
+
+
+def prune_tombstones() -> int:
+    """
+    Delete tombstones older than any token still accepted by the change feed.
+
+    Returns:
+        int: Number of deleted tombstones.
+    """
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()
+    return deleted
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from mainSite.changes import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Deletes tombstones of the change feed older than the oldest accepted token'
+
+    def handle(self, *args, **kwargs):
+        print(f"Deleted {prune_tombstones()} tombstones")
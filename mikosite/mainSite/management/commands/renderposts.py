@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from mainSite.markdown import RENDERER_VERSION
+from mainSite.models import Post
+from mikosite.versioning import bump_model_version
+
+
+class Command(BaseCommand):
+    help = 'Re-renders the stored Markdown HTML of posts rendered with an older renderer version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render all posts, not only outdated ones')
+
+    def handle(self, *args, **kwargs):
+        posts = Post.objects.only('id', 'content')
+        if not kwargs['all']:
+            posts = posts.filter(~Q(content_html_version=RENDERER_VERSION))
+
+        posts = list(posts)
+        now = timezone.now()
+        for post in posts:
+            post.render_content()
+            post.updated_at = now  # Changes the cache keys of the posts on the homepage
+        Post.objects.bulk_update(posts, ['content_html', 'content_html_version', 'updated_at'], batch_size=500)
+        bump_model_version(Post)
+        print(f"Re-rendered {len(posts)} posts")
@@ -1,3 +1,4 @@
+from markdown import Markdown
 from markdown.treeprocessors import Treeprocessor
 from markdown.extensions import Extension
 
@@ -13,3 +14,12 @@ class ReplaceHeadersProcessor(Treeprocessor):
 class DisallowHeadersExtension(Extension):
     def extendMarkdown(self, md):
         md.treeprocessors.register(ReplaceHeadersProcessor(md), 'disallow_headers', 175)
+
+
+# Increment after changing the extensions, then run `manage.py renderposts` to update the stored HTML of posts
+RENDERER_VERSION = 1
+
+
+def render_markdown(text: str) -> str:
+    # Markdown instances keep state between conversions, a new one per call is safe to use from any thread
+    return Markdown(extensions=[DisallowHeadersExtension()]).convert(text)
@@ -0,0 +1,56 @@
+from django.db import migrations, models
+from markdown import Markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+
+# Frozen copy of mainSite.markdown at the time of this migration, so that later changes of the module
+# do not change what the migration does. Posts rendered by a newer version are updated with `manage.py renderposts`.
+RENDERER_VERSION = 1
+
+
+class ReplaceHeadersProcessor(Treeprocessor):
+    def run(self, root):
+        for element in root.iter():
+            if element.tag in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+                element.tag = 'p'
+        return root
+
+
+class DisallowHeadersExtension(Extension):
+    def extendMarkdown(self, md):
+        md.treeprocessors.register(ReplaceHeadersProcessor(md), 'disallow_headers', 175)
+
+
+def render_markdown(text):
+    return Markdown(extensions=[DisallowHeadersExtension()]).convert(text)
+
+
+def render_posts(apps, schema_editor):
+    Post = apps.get_model('mainSite', 'Post')
+    posts = list(Post.objects.only('id', 'content'))
+    for post in posts:
+        post.content_html = render_markdown(post.content)
+        post.content_html_version = RENDERER_VERSION
+    Post.objects.bulk_update(posts, ['content_html', 'content_html_version'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainSite', '0007_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='content_html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_posts, migrations.RunPython.noop),
+    ]
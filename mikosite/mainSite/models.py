@@ -1,16 +1,11 @@
 import os
 from babel.dates import format_date, format_time
-from markdown import Markdown
-
 from django.conf import settings
 from django.db import models
 from django.utils.safestring import mark_safe
 
 from accounts.models import User
-from mainSite.markdown import DisallowHeadersExtension
-
-
-md = Markdown(extensions=[DisallowHeadersExtension()])
+from mainSite.markdown import RENDERER_VERSION, render_markdown
 
 
 class Post(models.Model):
@@ -21,10 +16,14 @@ class Post(models.Model):
     authors = models.ManyToManyField(User, blank=False)
 
     content = models.TextField(max_length=5000, blank=True)
+    content_html = models.TextField(blank=True, editable=False)
+    content_html_version = models.PositiveSmallIntegerField(default=0, editable=False)
 
     file = models.FileField(upload_to='post_files/', blank=True)
     images = models.ManyToManyField('Image', blank=True)
 
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
     class Meta:
         indexes = [
             models.Index(fields=["date", "time"]),
@@ -33,6 +32,30 @@ class Post(models.Model):
     def __str__(self):
         return f"POST {self.title} PUBLISHED {self.date} {self.time}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.render_content()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'content_html', 'content_html_version', 'updated_at'}
+        super().save(*args, **kwargs)
+
+    def render_content(self):
+        self.content_html = render_markdown(self.content)
+        self.content_html_version = RENDERER_VERSION
+
+    @property
+    def rendered_content(self) -> str:
+        # Posts not re-rendered yet after a renderer change are rendered on the fly
+        if self.content_html_version != RENDERER_VERSION:
+            return render_markdown(self.content)
+        return self.content_html
+
+    @property
+    def display_cache_key(self) -> str:
+        # Saving the post changes the key, so edited posts never hit outdated entries
+        return f'mainsite-post-{self.pk}-{self.updated_at.timestamp()}'
+
     def display_dict(self, locale=settings.BABEL_LOCALE) -> dict:
         return {
             'title': self.title,
@@ -40,7 +63,7 @@ class Post(models.Model):
             'authors': [{'username': author.username, 'full_name': author.full_name} for author in self.authors.all()],
             'file': {'url': self.file.url, 'name': os.path.basename(self.file.name)} if self.file else {},
             'images': [{'url': image, 'alt_text': 'obraz do posta'} for image in self.images.all()],
-            'content': mark_safe(md.convert(self.content)),
+            'content': mark_safe(self.rendered_content),
             'date': format_date(self.date, format='d MMMM y', locale=locale) if self.date else '',
             'time': format_time(self.time, format='HH:mm', locale=locale) if self.time else '',
         }
@@ -51,3 +74,15 @@ class Image(models.Model):
 
     def __str__(self):
         return str(self.image)
+
+
+class Tombstone(models.Model):
+    """
+    Deleted object of a model in the change feed, so that synchronizing clients learn about the deletion.
+    """
+    model = models.CharField(max_length=64)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"DELETED {self.model} {self.object_id} AT {self.deleted_at}"
@@ -17,7 +17,8 @@ class PostSerializer(serializers.ModelSerializer):
 class DisplayPostSerializer(serializers.ModelSerializer):
     authors = serializers.SlugRelatedField('full_name', many=True, read_only=True)
     images = PostImageSerializer(many=True, read_only=True)
+    content_html = serializers.CharField(source='rendered_content', read_only=True)
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'subtitle', 'date', 'time', 'content', 'authors', 'file', 'images']
+        fields = ['id', 'title', 'subtitle', 'date', 'time', 'content', 'content_html', 'authors', 'file', 'images']
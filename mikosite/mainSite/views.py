@@ -3,60 +3,138 @@ from django.core.cache import cache
 from django.dispatch import receiver
 from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.shortcuts import render
+from django.utils import timezone
 
+from mikosite.caching import get_or_compute, invalidate, peek
 from mainSite.models import Post
 from seminars.models import Seminar
+from seminars.signals import seminars_imported
 
 
 UPCOMING_SEMINARS_CACHE_KEY = 'upcoming-seminars-display-data'
 UPCOMING_SEMINARS_MAX_TTL = 86400  # 1 day
-MAINSITE_POSTS_CACHE_KEY = 'mainsite-posts-display-data'
+MAINSITE_POSTS_PER_PAGE = 10
 MAINSITE_POSTS_MAX_TTL = 86400
 
 
 def get_upcoming_seminars_data():
-    data = cache.get(UPCOMING_SEMINARS_CACHE_KEY)
-    if data is None:
+    def compute():
         next_seminars = Seminar.fetch_upcoming()
-        if next_seminars:
-            time_to_next_seminar = (next_seminars[0].start_timestamp - datetime.now()).total_seconds()
-        else:
-            time_to_next_seminar = UPCOMING_SEMINARS_MAX_TTL
+        return {
+            'ids': [seminar.pk for seminar in next_seminars],
+            'starts': [seminar.start_timestamp for seminar in next_seminars],
+            'data': [seminar.display_dict() for seminar in next_seminars],
+        }
 
-        data = [seminar.display_dict() for seminar in next_seminars]
-        cache.set(UPCOMING_SEMINARS_CACHE_KEY, data, min(time_to_next_seminar, UPCOMING_SEMINARS_MAX_TTL))
+    def time_to_next_seminar(cached):
+        # The list changes by itself only when the first seminar starts and stops being upcoming
+        if not cached['starts']:
+            return UPCOMING_SEMINARS_MAX_TTL
+        return min((cached['starts'][0] - datetime.now()).total_seconds(), UPCOMING_SEMINARS_MAX_TTL)
 
-    return data
+    cached = get_or_compute(UPCOMING_SEMINARS_CACHE_KEY, compute, soft_ttl=time_to_next_seminar,
+                            hard_ttl=UPCOMING_SEMINARS_MAX_TTL)
+    return cached['data']
+
+
+def affects_upcoming_seminars(seminars) -> bool:
+    """
+    Check whether a change of the given seminars can change the list of upcoming seminars.
+
+    Only seminars that are on the cached list or start in the future matter. Changes of past seminars,
+    like marking them as started or finished, keep the cached list.
+    """
+    cached = peek(UPCOMING_SEMINARS_CACHE_KEY)
+    if cached is None:
+        return False
+    now = datetime.now()
+    return any(seminar.pk in cached['ids'] or seminar.start_timestamp > now for seminar in seminars)
 
 
 @receiver(post_save, sender=Seminar)
 @receiver(post_delete, sender=Seminar)
-@receiver(m2m_changed, sender=Seminar.tutors.through)
-def clear_upcoming_seminars_cache(sender, **kwargs):
-    cache.delete(UPCOMING_SEMINARS_CACHE_KEY)
+def clear_upcoming_seminars_cache(sender, instance, **kwargs):
+    if affects_upcoming_seminars([instance]):
+        invalidate(UPCOMING_SEMINARS_CACHE_KEY)
 
 
-def get_posts_data():
-    data = cache.get(MAINSITE_POSTS_CACHE_KEY)
-    if data is None:
-        posts = Post.objects.order_by('-date', '-time').prefetch_related('authors', 'images')
-        data = [post.display_dict() for post in posts]
-        cache.set(MAINSITE_POSTS_CACHE_KEY, data, MAINSITE_POSTS_MAX_TTL)
-
-    return data
+@receiver(m2m_changed, sender=Seminar.tutors.through)
+def clear_upcoming_seminars_tutors_cache(sender, instance, reverse, pk_set, **kwargs):
+    if reverse:
+        # Seminars of a user were changed, pk_set holds seminar ids (or is None when all were removed)
+        cached = peek(UPCOMING_SEMINARS_CACHE_KEY)
+        if cached is not None and (pk_set is None or set(cached['ids']) & pk_set):
+            invalidate(UPCOMING_SEMINARS_CACHE_KEY)
+    elif affects_upcoming_seminars([instance]):
+        invalidate(UPCOMING_SEMINARS_CACHE_KEY)
+
+
+@receiver(seminars_imported)
+def clear_imported_seminars_cache(sender, seminars, **kwargs):
+    if affects_upcoming_seminars(seminars):
+        invalidate(UPCOMING_SEMINARS_CACHE_KEY)
+
+
+def get_posts_page(page: int) -> dict:
+    """
+    Get display data of one page of posts, newest first.
+
+    Only ids and update times of the page are queried. Display dicts (with the rendered Markdown) are cached
+    separately for every post under a key containing its update time, so editing a post recomputes only that post
+    and the cached data never grows with the number of posts.
+
+    Args:
+        page (int): Page number, starting from 1.
+
+    Returns:
+        dict: `posts` (list of display dicts), `page`, `previous_page` and `next_page` (None if there is no such page).
+    """
+    offset = (page - 1) * MAINSITE_POSTS_PER_PAGE
+    rows = list(Post.objects.order_by('-date', '-time', '-id')
+                .values_list('id', 'updated_at')[offset:offset + MAINSITE_POSTS_PER_PAGE + 1])
+    has_next = len(rows) > MAINSITE_POSTS_PER_PAGE
+    keys = {post_id: Post(id=post_id, updated_at=updated_at).display_cache_key
+            for post_id, updated_at in rows[:MAINSITE_POSTS_PER_PAGE]}
+
+    cached = cache.get_many(keys.values())
+    missing = [post_id for post_id, key in keys.items() if key not in cached]
+    if missing:
+        posts = Post.objects.filter(id__in=missing).prefetch_related('authors', 'images')
+        computed = {post.display_cache_key: post.display_dict() for post in posts}
+        cache.set_many(computed, MAINSITE_POSTS_MAX_TTL)
+        cached.update(computed)
+
+    return {
+        # A post deleted or edited since the ids were fetched is skipped until the next request
+        'posts': [cached[key] for key in keys.values() if key in cached],
+        'page': page,
+        'previous_page': page - 1 if page > 1 else None,
+        'next_page': page + 1 if has_next else None,
+    }
 
 
-@receiver(post_save, sender=Post)
-@receiver(post_delete, sender=Post)
 @receiver(m2m_changed, sender=Post.authors.through)
 @receiver(m2m_changed, sender=Post.images.through)
-def clear_posts_cache(sender, **kwargs):
-    cache.delete(MAINSITE_POSTS_CACHE_KEY)
+def touch_posts(sender, instance, action, reverse, pk_set, **kwargs):
+    # Changing authors or images does not save the post, bump its update time to change its cache key
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Post.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+    elif action in ('post_add', 'post_remove'):
+        # Posts of a user or an image were changed, pk_set holds post ids
+        Post.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+    elif action == 'pre_clear':
+        field = 'authors' if sender is Post.authors.through else 'images'
+        Post.objects.filter(**{field: instance}).update(updated_at=timezone.now())
 
 
 def index(request):
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
     context = {
-        "posts": get_posts_data,
+        **get_posts_page(page),
         "events": get_upcoming_seminars_data,
         "user": request.user
     }
@@ -0,0 +1,129 @@
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Union
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 30  # seconds after which a lock of a crashed worker expires
+LOCK_WAIT = 2  # seconds a worker without any cached value waits for the one computing it
+LOCK_POLL_INTERVAL = 0.05
+
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
+
+
+def _entry_key(key):
+    return f'{key}:entry'
+
+
+def _version_key(key):
+    return f'{key}:version'
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _acquire_lock(key) -> Optional[str]:
+    # cache.add is an atomic SET NX in Redis, so only one worker of all processes gets the lock
+    token = uuid.uuid4().hex
+    return token if cache.add(_lock_key(key), token, LOCK_TIMEOUT) else None
+
+
+def _release_lock(key, token):
+    if cache.get(_lock_key(key)) == token:
+        cache.delete(_lock_key(key))
+
+
+def invalidate(key):
+    """
+    Mark the cached value as outdated by bumping its version.
+
+    The value stays in the cache and is served while a single worker computes the new one,
+    so an edit during heavy traffic does not make every worker recompute it at once.
+    """
+    try:
+        cache.incr(_version_key(key))
+    except ValueError:
+        cache.set(_version_key(key), 1, None)
+
+
+def peek(key) -> Any:
+    """
+    Return the cached value even if it is outdated, None if nothing is cached.
+    """
+    entry = cache.get(_entry_key(key))
+    return entry['value'] if entry is not None else None
+
+
+def _compute_and_store(key, compute, soft_ttl, hard_ttl, version, token):
+    try:
+        value = compute()
+        ttl = soft_ttl(value) if callable(soft_ttl) else soft_ttl
+        entry = {'value': value, 'version': version, 'fresh_until': time.time() + ttl}
+        cache.set(_entry_key(key), entry, max(1, int(hard_ttl or ttl)))
+        return value
+    finally:
+        _release_lock(key, token)
+
+
+def _refresh_in_background(*args):
+    try:
+        _compute_and_store(*args)
+    except Exception:
+        logger.exception("Refreshing cache key %s failed", args[0])
+    finally:
+        connections.close_all()  # Connections of this thread only
+
+
+def get_or_compute(key: str, compute: Callable[[], Any], soft_ttl: Union[float, Callable[[Any], float]],
+                   hard_ttl: Optional[float] = None):
+    """
+    Get a cached value with stale-while-revalidate semantics.
+
+    A value is fresh for `soft_ttl` seconds (which may be computed from the value) and until its key is invalidated.
+    A stale value is still returned, while exactly one worker, the one that gets the lock, computes the new value,
+    in a background thread (or synchronously if settings.CACHE_REFRESH_IN_BACKGROUND is False).
+    Only when nothing is cached at all the caller waits for the value.
+
+    Args:
+        key (str): Cache key.
+        compute (Callable): Function computing the value.
+        soft_ttl (float or Callable): Seconds after which the value should be recomputed.
+        hard_ttl (Optional[float]): Seconds after which the value is removed from the cache, `soft_ttl` if None.
+
+    Returns:
+        The cached or computed value.
+    """
+    cached = cache.get_many([_entry_key(key), _version_key(key)])
+    entry, version = cached.get(_entry_key(key)), cached.get(_version_key(key), 0)
+    if entry is not None and entry['version'] == version and time.time() < entry['fresh_until']:
+        return entry['value']
+
+    token = _acquire_lock(key)
+    if entry is not None:
+        if token is not None:
+            args = (key, compute, soft_ttl, hard_ttl, version, token)
+            if getattr(settings, 'CACHE_REFRESH_IN_BACKGROUND', True):
+                _refresh_executor.submit(_refresh_in_background, *args)
+            else:
+                return _compute_and_store(*args)
+        return entry['value']
+
+    if token is not None:
+        return _compute_and_store(key, compute, soft_ttl, hard_ttl, version, token)
+
+    # Someone else computes the value, wait for it instead of stampeding the database
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(_entry_key(key))
+        if entry is not None:
+            return entry['value']
+    return compute()
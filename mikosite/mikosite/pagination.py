@@ -1,6 +1,81 @@
-from rest_framework.pagination import LimitOffsetPagination
+import json
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class OrderedCursorPagination(CursorPagination):
+    """
+    Cursor pagination over the `cursor_ordering` of a view, with the page size taken from `limit`.
+    """
+    page_size_query_param = 'limit'
+
+    def __init__(self, ordering, page_size, max_page_size):
+        self.ordering = ordering
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+
+def estimate_count(queryset) -> int:
+    """
+    Number of rows the query planner expects the queryset to return, an exact count on databases without estimates.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return plan[0]['Plan']['Plan Rows']
 
 
 class CustomLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with two opt-in modes for large tables.
+
+    `?cursor=` (empty for the first page) switches to cursor pagination on views declaring `cursor_ordering`,
+    indexed columns the rows are ordered by. Every page is then a range scan, whatever its depth, and the response
+    has `next` and `previous` cursor links but no `count`.
+
+    `?count=false` skips the COUNT(*) query (`count` is null and `next` is found by fetching one extra row),
+    `?count=estimate` replaces it with the estimate of the query planner.
+    """
     default_limit = 30
     max_limit = 200
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_pagination = None
+        self.has_next = None
+        cursor_ordering = getattr(view, 'cursor_ordering', None)
+        if cursor_ordering is not None and self.cursor_query_param in request.query_params:
+            self.cursor_pagination = OrderedCursorPagination(cursor_ordering, self.default_limit, self.max_limit)
+            return self.cursor_pagination.paginate_queryset(queryset, request, view)
+
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode not in ('false', 'estimate'):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.display_page_controls = False
+        page = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(page) > self.limit
+        self.count = estimate_count(queryset) if count_mode == 'estimate' else None
+        return page[:self.limit]
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.has_next is None:
+            return super().get_next_link()
+        # Without an exact count the extra row fetched with the page tells if there is a next one
+        if not self.has_next:
+            return None
+        url = replace_query_param(self.request.build_absolute_uri(), self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
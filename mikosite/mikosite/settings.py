@@ -186,6 +186,7 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 USE_REDIS_WITH_DEBUG = False
+CACHE_REFRESH_IN_BACKGROUND = True  # Recompute stale values of mikosite.caching in a thread, serving the old ones
 if not DEBUG or USE_REDIS_WITH_DEBUG:
     CACHES = {
         "default": {
@@ -21,7 +21,7 @@ from django.conf.urls.static import static
 
 from rest_framework.routers import DefaultRouter
 from seminars.api_views import SeminarGroupViewSet, SeminarViewSet, GoogleFormViewSet, ReminderViewSet
-from mainSite.api_views import PostImageViewSet, PostViewSet
+from mainSite.api_views import PostImageViewSet, PostViewSet, ChangeFeedViewSet
 from accounts.api_views import UserViewSet, LinkedAccountViewSet, UserActivityViewSet, ActivityScoreViewSet
 
 router = DefaultRouter()
@@ -35,12 +35,14 @@ router.register(r'user-activity', UserActivityViewSet, basename='user-activity')
 router.register(r'activity-scores', ActivityScoreViewSet)
 router.register(r'google-form-template', GoogleFormViewSet)
 router.register(r'reminders', ReminderViewSet)
+router.register(r'changes', ChangeFeedViewSet, basename='changes')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("", include("mainSite.urls")),
     path('', include('accounts.urls')),
     path('kolo/', include('seminars.urls')),
+    path('cards/', include('cards.urls')),
     # path("bazahintow/", include("hintBase.urls")),
     path('api/', include(router.urls)),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,196 @@
+import hashlib
+import time
+import uuid
+from typing import Optional
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlencode
+from rest_framework.response import Response
+
+
+MODEL_VERSION_CACHE_KEY = 'model-version-{}'
+RESPONSE_CACHE_KEY = 'api-response-{}'
+
+
+def _version_key(model):
+    # Models or names of versions started with track_field_version
+    return MODEL_VERSION_CACHE_KEY.format(model if isinstance(model, str) else model._meta.label_lower)
+
+
+def _set_new_version(models):
+    version = (uuid.uuid4().hex, time.time())
+    cache.set_many({_version_key(model): version for model in models}, None)
+
+
+def bump_model_version(*models):
+    """
+    Mark the data of the models (or named versions) as changed, for writes that send no signals (bulk_create, update).
+    """
+    _set_new_version(models)
+    # Requests between the first bump and the commit still read the old rows, so bump once more after it
+    transaction.on_commit(lambda: _set_new_version(models))
+
+
+def get_model_versions(models) -> list[tuple]:
+    """
+    Get (version token, last modification time) of every model, starting new versions for models without one.
+    """
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Evicted or never written, clients holding an older validator simply get the full response once
+            cache.add(key, (uuid.uuid4().hex, time.time()), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def track_field_version(model, fields: tuple[str, ...], name: str) -> str:
+    """
+    Start a version of a part of the data of a model, bumped when a saved instance changed one of the fields,
+    or when an instance is created or deleted.
+
+    Responses showing only these fields are then not invalidated by saves of other fields, like `last_login`
+    updated by every login.
+
+    Returns:
+        str: The name, to be used like a model in `version_models` and bump_model_version.
+    """
+    attnames = [model._meta.get_field(field).attname for field in fields]
+    snapshot_attribute = f'_version_snapshot_{name}'
+
+    def snapshot(instance):
+        # Deferred fields are not loaded, they count as changed if they are assigned before the save
+        return {attname: instance.__dict__[attname] for attname in attnames if attname in instance.__dict__}
+
+    def remember_fields(sender, instance, **kwargs):
+        setattr(instance, snapshot_attribute, snapshot(instance))
+
+    def bump_changed_fields(sender, instance, created, update_fields=None, **kwargs):
+        previous = getattr(instance, snapshot_attribute, {})
+        current = snapshot(instance)
+        setattr(instance, snapshot_attribute, current)
+        if update_fields is not None and not set(update_fields) & set(fields):
+            return
+        if created or any(attname not in previous or previous[attname] != value for attname, value in current.items()):
+            bump_model_version(name)
+
+    def bump_deleted(sender, **kwargs):
+        bump_model_version(name)
+
+    post_init.connect(remember_fields, sender=model, weak=False, dispatch_uid=name)
+    post_save.connect(bump_changed_fields, sender=model, weak=False, dispatch_uid=name)
+    post_delete.connect(bump_deleted, sender=model, weak=False, dispatch_uid=name)
+    return name
+
+
+# Models in the `version_models` of some ConditionalGetMixin subclass, filled when the viewsets are defined
+VERSIONED_MODELS = set()
+
+
+def bump_saved_model_version(sender, **kwargs):
+    bump_model_version(sender)
+
+
+def bump_related_model_versions(sender, instance, action, model, **kwargs):
+    if action.startswith('post_'):
+        bump_model_version(*(changed for changed in (type(instance), model) if changed in VERSIONED_MODELS))
+
+
+def connect_version_receivers():
+    """
+    Bump the versions of VERSIONED_MODELS on their save, delete and m2m signals.
+
+    Receivers are connected only for these models, other models keep Django's fast delete path
+    and send no cache writes.
+    """
+    for model in VERSIONED_MODELS:
+        post_save.connect(bump_saved_model_version, sender=model, dispatch_uid='bump_model_version')
+        post_delete.connect(bump_saved_model_version, sender=model, dispatch_uid='bump_model_version')
+    for model in apps.get_models():
+        for field in model._meta.local_many_to_many:
+            if model in VERSIONED_MODELS or field.related_model in VERSIONED_MODELS:
+                m2m_changed.connect(bump_related_model_versions, sender=field.remote_field.through,
+                                    dispatch_uid='bump_model_version')
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified for the `list` and `retrieve` actions of a viewset, answering 304 Not Modified
+    without running the query or the serializer.
+
+    The validators are computed from the versions of `version_models`, which have to include every model
+    the responses are built from, together with the path, the sorted query parameters and whether the user is staff.
+    Responses for which `is_response_cacheable` is true are also cached on the server under their ETag,
+    so a request without a matching validator skips the query and the serializer too.
+    """
+    version_models = ()
+    response_cache_timeout = 3600
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Named versions (strings) are bumped by their own receivers, see track_field_version
+        VERSIONED_MODELS.update(model for model in cls.version_models if not isinstance(model, str))
+
+    def is_response_cacheable(self, request) -> bool:
+        return False
+
+    def is_conditional(self, request) -> bool:
+        """
+        Whether the response is determined by the versions and the variant, false e.g. if it depends on the time.
+        """
+        return True
+
+    def get_variant(self, request) -> tuple[str, Optional[float]]:
+        """
+        State the response depends on besides the request and the models, such as a range of dates relative to today.
+
+        Returns:
+            tuple: The state as a string and the time it last changed, None if it never changes.
+        """
+        return '', None
+
+    def get_validators(self, request):
+        versions = get_model_versions(self.version_models)
+        extra_variant, variant_modified = self.get_variant(request)
+        query = urlencode(sorted((key, sorted(values)) for key, values in request.query_params.lists()), doseq=True)
+        # Links in paginated responses contain the host
+        variant = (f'{request.build_absolute_uri(request.path)}?{query}|{request.user.is_staff}'
+                   f'|{request.accepted_media_type}|{extra_variant}')
+        digest = hashlib.md5(repr((variant, [token for token, _ in versions])).encode()).hexdigest()
+        modified_times = [modified for _, modified in versions]
+        if variant_modified is not None:
+            modified_times.append(variant_modified)
+        return f'"{digest}"', max(modified_times)
+
+    def conditional(self, handler, request, *args, **kwargs):
+        if not self.is_conditional(request):
+            return handler(request, *args, **kwargs)
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+        if response is None and self.is_response_cacheable(request):
+            # The ETag changes with any change of the data, so outdated responses are never found
+            key = RESPONSE_CACHE_KEY.format(etag.strip('"'))
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response.data, self.response_cache_timeout)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
@@ -1,11 +1,18 @@
 from datetime import datetime
 
-from rest_framework import viewsets
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from django_filters import rest_framework as filters
 from rest_framework import permissions
 from django_filters import UnknownFieldBehavior
 from babel import Locale
 
+from accounts.models import USER_DISPLAY_VERSION, User
+from mikosite.versioning import ConditionalGetMixin
+from .bulk import export_seminar_rows, parse_seminar_rows, upsert_seminars, validate_seminar_rows
 from .models import SeminarGroup, Seminar, GoogleFormsTemplate, Reminder
 from .serializers import SeminarGroupSerializer, SeminarSerializer, DisplaySeminarSerializer, GoogleFormSerializer, \
     RemindersSerializer
@@ -13,8 +20,9 @@ from .serializers import SeminarGroupSerializer, SeminarSerializer, DisplaySemin
 locale = Locale('pl_PL')
 
 
-class SeminarGroupViewSet(viewsets.ModelViewSet):
+class SeminarGroupViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = SeminarGroup.objects.all()
+    version_models = (SeminarGroup,)
     serializer_class = SeminarGroupSerializer
 
 
@@ -28,17 +36,24 @@ class SeminarFilter(filters.FilterSet):
         fields = ['group', 'date']
 
 
-class GoogleFormViewSet(viewsets.ModelViewSet):
+class GoogleFormViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = GoogleFormsTemplate.objects.all()
+    version_models = (GoogleFormsTemplate,)
     serializer_class = GoogleFormSerializer
     permission_classes = [permissions.IsAdminUser]
 
 
-class ReminderViewSet(viewsets.ModelViewSet):
+class ReminderViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Reminder.objects.all()
+    version_models = (Reminder,)
+    cursor_ordering = ('date_time', 'id')
     serializer_class = RemindersSerializer
     permission_classes = [permissions.IsAdminUser]
 
+    def is_conditional(self, request):
+        # The next reminder changes as time passes, without any change of the data
+        return not request.query_params.get('only_next', None)
+
     def get_queryset(self):
         # Filter reminders with `date_time` greater than now and order by `date_time`
         only_next = self.request.query_params.get('only_next', None)
@@ -51,18 +66,55 @@ class ReminderViewSet(viewsets.ModelViewSet):
             return Reminder.objects.all()
 
 
-class SeminarViewSet(viewsets.ModelViewSet):
+class SeminarViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Seminar.objects.all()
+    version_models = (Seminar, SeminarGroup, GoogleFormsTemplate, USER_DISPLAY_VERSION)
+    cursor_ordering = ('date', 'time', 'id')
     serializer_class = SeminarSerializer
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = SeminarFilter
 
+    def is_response_cacheable(self, request):
+        # Display lists are polled by the Discord bot and are the same for all users
+        return self.action == 'list' and bool(request.query_params.get('display_only'))
+
     def get_queryset(self):
+        # Fetch everything the chosen serializer touches, so a page costs the same number of queries at any size
         display_only = self.request.query_params.get('display_only', None)
-        return Seminar.objects.select_related('group').prefetch_related('tutors') if display_only else self.queryset
+        if display_only:
+            tutors = Prefetch('tutors', queryset=User.objects.only('id', 'name', 'surname'))
+            return Seminar.objects.select_related('group').prefetch_related(tutors)
+        return self.queryset.prefetch_related(Prefetch('tutors', queryset=User.objects.only('id')))
 
     def get_serializer_class(self):
         if self.action not in ['list', 'retrieve']:
             return self.serializer_class
         display_only = self.request.query_params.get('display_only', None)
         return DisplaySeminarSerializer if display_only else self.serializer_class
+
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[permissions.IsAdminUser])
+    def bulk_upsert(self, request):
+        """
+        Create (rows without an id) or update (rows with an id, only the fields they contain) many seminars
+        with their tutors.
+
+        The body is CSV (Content-Type: text/csv) or JSON lines. Nothing is written unless all rows are valid.
+        """
+        rows, errors = parse_seminar_rows(request.body.decode('utf-8-sig'), request.content_type)
+        if not errors:
+            validated, errors = validate_seminar_rows(rows)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(upsert_seminars(validated), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Stream the (filtered) seminars in the format of the bulk endpoint, as JSON lines or with ?as=csv as CSV.
+        """
+        as_csv = request.query_params.get('as') == 'csv'
+        queryset = self.filter_queryset(Seminar.objects.all())
+        response = StreamingHttpResponse(export_seminar_rows(queryset, as_csv=as_csv),
+                                         content_type='text/csv' if as_csv else 'application/jsonl')
+        response['Content-Disposition'] = f'attachment; filename="seminars.{"csv" if as_csv else "jsonl"}"'
+        return response
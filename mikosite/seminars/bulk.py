@@ -0,0 +1,241 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from .models import GoogleFormsTemplate, Seminar, SeminarGroup, Reminder
+from .serializers import BulkSeminarSerializer
+from .signals import build_reminders, reminder_times, seminars_imported
+
+
+BULK_BATCH_SIZE = 500  # Seminars written in one transaction
+CSV_LIST_SEPARATOR = ';'  # Separates tutor ids in a CSV cell
+BULK_FIELDS = BulkSeminarSerializer.Meta.fields
+UPDATED_FIELDS = [field for field in BULK_FIELDS if field not in ('id', 'tutors')] + ['updated_at']
+
+
+def import_seminars(seminars: list[Seminar], tutor_ids: Optional[list[Iterable[int]]] = None) -> list[Seminar]:
+    """
+    Create many seminars together with their reminders and tutors in a constant number of queries.
+
+    Seminars are created with bulk_create, so no post_save signals are sent. The reminders they would create are
+    created here instead, and `seminars_imported` is sent once the transaction commits so that caches and the
+    reminder scheduler can refresh.
+
+    Args:
+        seminars (list[Seminar]): Unsaved seminars.
+        tutor_ids (Optional[list[Iterable[int]]]): Ids of the tutors of every seminar, in the same order.
+
+    Returns:
+        list[Seminar]: The created seminars, with primary keys set.
+    """
+    with transaction.atomic():
+        seminars = Seminar.objects.bulk_create(seminars)
+        Reminder.objects.bulk_create([reminder for seminar in seminars for reminder in build_reminders(seminar)])
+        if tutor_ids:
+            set_tutors(seminars, tutor_ids, replace=False)
+        transaction.on_commit(lambda: seminars_imported.send(sender=Seminar, seminars=seminars))
+    return seminars
+
+
+def update_seminars(seminars: list[Seminar], tutor_ids: list[Optional[Iterable[int]]],
+                    fields: Iterable[str] = UPDATED_FIELDS) -> list[Seminar]:
+    """
+    Save changed fields of many seminars, their tutors and the times of their reminders in a constant number of queries.
+
+    Args:
+        seminars (list[Seminar]): Seminars loaded from the database, with the new values assigned.
+        tutor_ids (list[Optional[Iterable[int]]]): Ids of the new tutors of every seminar, in the same order,
+            None to keep the current tutors of a seminar.
+        fields (Iterable[str]): Names of the changed fields, the other columns are not written.
+
+    Returns:
+        list[Seminar]: The updated seminars.
+    """
+    now = timezone.now()  # bulk_update does not set auto_now fields
+    fields = [field for field in fields if field != 'updated_at'] + ['updated_at']
+    with transaction.atomic():
+        for seminar in seminars:
+            seminar.updated_at = now
+        Seminar.objects.bulk_update(seminars, fields)
+        times = {seminar.pk: reminder_times(seminar) for seminar in seminars}
+        reminders = list(Reminder.objects.filter(seminar_id__in=times, type__in=('invite', 'feedback')))
+        for reminder in reminders:
+            reminder.date_time = times[reminder.seminar_id][reminder.type]
+            reminder.updated_at = now
+        Reminder.objects.bulk_update(reminders, ['date_time', 'updated_at'])
+        retutored = [(seminar, user_ids) for seminar, user_ids in zip(seminars, tutor_ids) if user_ids is not None]
+        if retutored:
+            set_tutors(*zip(*retutored), replace=True)
+        transaction.on_commit(lambda: seminars_imported.send(sender=Seminar, seminars=seminars))
+    return seminars
+
+
+def set_tutors(seminars: list[Seminar], tutor_ids: list[Iterable[int]], replace: bool):
+    through = Seminar.tutors.through
+    if replace:
+        through.objects.filter(seminar_id__in=[seminar.pk for seminar in seminars]).delete()
+    through.objects.bulk_create([through(seminar_id=seminar.pk, user_id=user_id)
+                                 for seminar, user_ids in zip(seminars, tutor_ids) for user_id in user_ids])
+
+
+def parse_seminar_rows(content: str, content_type: str) -> tuple[list, list]:
+    """
+    Split the body of a bulk import into rows.
+
+    CSV files need a header with column names from BULK_FIELDS, which may be a subset of them when updating.
+    Empty cells are nulls and tutors are ids separated with CSV_LIST_SEPARATOR. Any other content type is read
+    as JSON lines, one seminar object per line.
+
+    Returns:
+        tuple:
+            list[dict]: Rows as they would be posted to the API.
+            list[dict]: Errors, with the row number (counted from 1, without the CSV header).
+    """
+    rows, errors = [], []
+    # Only the media type matters, parameters such as charset are dropped
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    if media_type == 'text/csv':
+        for row in csv.DictReader(io.StringIO(content)):
+            row = {key: value if value != '' else None for key, value in row.items()}
+            if 'tutors' in row:
+                tutors = row['tutors']
+                row['tutors'] = tutors.split(CSV_LIST_SEPARATOR) if tutors else []
+            rows.append(row)
+        return rows, errors
+
+    for number, line in enumerate(filter(str.strip, content.splitlines()), start=1):
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors.append({'row': number, 'errors': f"Invalid JSON: {e}"})
+            continue
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'errors': "Expected a JSON object."})
+            continue
+        rows.append(row)
+    return rows, errors
+
+
+def validate_seminar_rows(rows: list[dict]) -> tuple[list, list]:
+    """
+    Validate rows of a bulk import, checking all referenced objects with one query per model.
+
+    Returns:
+        tuple:
+            list[dict]: Validated data of every row.
+            list[dict]: Errors, with the row number (counted from 1).
+    """
+    validated, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        # Rows with an id update only the fields they contain
+        serializer = BulkSeminarSerializer(data=row, partial=row.get('id') not in (None, ''))
+        if serializer.is_valid():
+            validated.append(serializer.validated_data)
+        else:
+            errors.append({'row': number, 'errors': serializer.errors})
+    if errors:
+        return validated, errors
+
+    references = [
+        ('id', Seminar, lambda data: [data.get('id')]),
+        ('group', SeminarGroup, lambda data: [data.get('group_id')]),
+        ('form', GoogleFormsTemplate, lambda data: [data.get('form_id')]),
+        ('tutors', User, lambda data: data.get('tutors', [])),
+    ]
+    for field, model, get_ids in references:
+        wanted = {pk for data in validated for pk in get_ids(data) if pk is not None}
+        existing = set(model.objects.filter(pk__in=wanted).values_list('pk', flat=True)) if wanted else set()
+        for number, data in enumerate(validated, start=1):
+            missing = [pk for pk in get_ids(data) if pk is not None and pk not in existing]
+            if missing:
+                errors.append({'row': number, 'errors': {field: [f"Objects with ids {missing} do not exist."]}})
+    if errors:
+        return validated, errors
+
+    # Updates finishing a seminar without passing `started` are checked against the stored value
+    finishing = {data['id'] for data in validated if data.get('id') is not None
+                 and data.get('finished') and 'started' not in data}
+    not_started = set(Seminar.objects.filter(pk__in=finishing, started=False).values_list('pk', flat=True)
+                      ) if finishing else set()
+    for number, data in enumerate(validated, start=1):
+        if data.get('id') in not_started and data.get('finished') and 'started' not in data:
+            errors.append({'row': number,
+                           'errors': {'non_field_errors': ["A finished seminar must have been started."]}})
+    return validated, errors
+
+
+def upsert_seminars(validated: list[dict]) -> dict:
+    """
+    Create rows without an id and update seminars with the given ids, in transactions of BULK_BATCH_SIZE rows.
+
+    An update changes only the fields present in its row, like PATCH. Omitted fields and omitted tutors are kept.
+
+    Returns:
+        dict: Numbers of created and updated seminars.
+    """
+    counts = {'created': 0, 'updated': 0}
+    for start in range(0, len(validated), BULK_BATCH_SIZE):
+        batch = validated[start:start + BULK_BATCH_SIZE]
+        new = [data for data in batch if data.get('id') is None]
+        existing = [data for data in batch if data.get('id') is not None]
+
+        with transaction.atomic():
+            if new:
+                import_seminars([Seminar(**{key: value for key, value in data.items() if key != 'tutors'})
+                                 for data in new],
+                                [data.get('tutors', []) for data in new])
+            if existing:
+                loaded = Seminar.objects.select_for_update().in_bulk([data['id'] for data in existing])
+                seminars, fields = [], set()
+                for data in existing:
+                    seminar = loaded[data['id']]
+                    for key, value in data.items():
+                        if key not in ('id', 'tutors'):
+                            setattr(seminar, key, value)
+                            fields.add(Seminar._meta.get_field(key).name)
+                    seminars.append(seminar)
+                update_seminars(seminars, [data.get('tutors') for data in existing], sorted(fields))
+        counts['created'] += len(new)
+        counts['updated'] += len(existing)
+    return counts
+
+
+class Echo:
+    """
+    File-like object returning what is written to it, for streaming csv.writer output.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_seminar_rows(queryset, as_csv: bool = False) -> Iterator[str]:
+    """
+    Stream seminars in the bulk import format, reading them from the database in chunks.
+
+    Args:
+        queryset (QuerySet): Seminars to export.
+        as_csv (bool): Produce CSV with a header instead of JSON lines.
+
+    Yields:
+        str: Lines of the export.
+    """
+    seminars = queryset.prefetch_related('tutors').order_by('date', 'time', 'pk').iterator(chunk_size=BULK_BATCH_SIZE)
+    rows = (BulkSeminarSerializer(seminar).data for seminar in seminars)
+
+    if not as_csv:
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        return
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(BULK_FIELDS)
+    for row in rows:
+        row['tutors'] = CSV_LIST_SEPARATOR.join(map(str, row['tutors']))
+        yield writer.writerow(['' if row[field] is None else row[field] for field in BULK_FIELDS])
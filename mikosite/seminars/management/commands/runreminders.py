@@ -0,0 +1,25 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand
+
+from seminars.reminders import LogSink, ReminderScheduler, WebhookSink
+
+
+class Command(BaseCommand):
+    help = 'Sends seminar reminders at their time to a webhook (or only logs them)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--webhook', help='URL receiving every due reminder as a JSON POST request')
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO)
+        sink = WebhookSink(options['webhook']) if options['webhook'] else LogSink()
+        scheduler = ReminderScheduler(sink)
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: scheduler.stop())
+
+        print(f"Sending reminders to {options['webhook'] or 'the log'}")
+        scheduler.run()
+        print("Reminder scheduler stopped")
@@ -1,7 +1,8 @@
 from datetime import datetime, date
 from babel.dates import format_date, format_time
 from django.db import models
-from django.db.models import Q
+from django.db.models import F, Q, Window
+from django.db.models.functions import FirstValue, RowNumber
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.conf import settings
 from django.template.defaultfilters import length
@@ -19,6 +20,7 @@ class SeminarGroup(models.Model):
     discord_voice_channel_id = models.CharField(max_length=128, blank=True, null=True)
     default_difficulty = models.IntegerField(default=0, blank=False, null=False,
                                              validators=[MinValueValidator(0), MaxValueValidator(5)])
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # For the change feed
 
     def __str__(self):
         return f"GROUP {self.name} LEVEL {self.default_difficulty}"
@@ -67,6 +69,7 @@ class Seminar(models.Model):
 
     image = models.ImageField(upload_to='kolo_images/', blank=True, null=True)
     file = models.FileField(upload_to='kolo_files/', blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # For the change feed
 
     class Meta:
         indexes = [
@@ -90,20 +93,23 @@ class Seminar(models.Model):
 
     @classmethod
     def fetch_upcoming(cls, start_timestamp: datetime = None):
+        """
+        Seminars starting after `start_timestamp` (now by default): the next 3, or all happening on the same
+        (earliest) day if there are more of them, with groups and tutors loaded.
+
+        Both cases are one rule: a seminar is returned if it is among the first 3 or on the day of the first one,
+        which is resolved in a single query with window functions.
+        """
         start_timestamp = start_timestamp or datetime.now()
         future_seminars = Seminar.objects.filter((Q(date=start_timestamp.date()) & Q(time__gt=start_timestamp.time()))
                                                  | Q(date__gt=start_timestamp.date()))
-        future_seminars = future_seminars.order_by('date', 'time')
-
-        first_seminar = future_seminars.first()
-        if first_seminar is None:
-            return []
-
-        # get next 3 seminars or all that happen on the same (earliest) day
-        next_seminars = future_seminars.filter(date=first_seminar.date)
-        if next_seminars.count() < 3:
-            next_seminars = future_seminars[:3]
-        return next_seminars.select_related('group').prefetch_related('tutors')
+        order = [F('date').asc(), F('time').asc(), F('id').asc()]
+        next_seminars = (future_seminars
+                         .annotate(position=Window(RowNumber(), order_by=order),
+                                   first_date=Window(FirstValue('date'), order_by=order))
+                         .filter(Q(position__lte=3) | Q(date=F('first_date')))
+                         .order_by('date', 'time', 'id'))
+        return list(next_seminars.select_related('group').prefetch_related('tutors'))
 
     @property
     def start_timestamp(self):
@@ -164,6 +170,7 @@ class Reminder(models.Model):
     type = models.CharField(max_length=256, blank=False, null=False)
     date_time = models.DateTimeField()
     pinged = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # For the change feed
 
     class Meta:
         indexes = [models.Index(name='reminder_index', fields=['date_time'])]
@@ -0,0 +1,200 @@
+import heapq
+import json
+import logging
+import threading
+import urllib.request
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from mikosite.versioning import bump_model_version
+from .models import Reminder
+from .serializers import RemindersSerializer
+
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_VERSION_CACHE_KEY = 'seminar-reminders-version'
+REMINDER_GRACE_PERIOD = timedelta(hours=1)  # Reminders missed by less than this (e.g. during a restart) are still sent
+RESYNC_INTERVAL = 5  # seconds between checks for reminder changes made by other processes
+RETRY_DELAY = timedelta(minutes=1)
+
+
+class ReminderSink:
+    """
+    Destination of due reminders. Subclasses deliver the serialized reminder and raise on failure.
+    """
+
+    def send(self, reminder: Reminder, payload: dict):
+        raise NotImplementedError
+
+
+class WebhookSink(ReminderSink):
+    """
+    POST every reminder as JSON (the same format as in the reminders API) to a webhook URL.
+    """
+
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, reminder, payload):
+        request = urllib.request.Request(self.url, data=json.dumps(payload, cls=DjangoJSONEncoder).encode(),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class LogSink(ReminderSink):
+    """
+    Only log the reminders, for development.
+    """
+
+    def send(self, reminder, payload):
+        logger.info("Reminder %s for seminar %s at %s", reminder.type, reminder.seminar_id, reminder.date_time)
+
+
+class LocalSink(ReminderSink):
+    """
+    Collect the reminders in memory, for tests.
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, reminder, payload):
+        self.sent.append(payload)
+
+
+class ReminderScheduler:
+    """
+    Deliver reminders to a sink at their `date_time` instead of having clients poll for them.
+
+    Pending reminders are kept in a heap ordered by `date_time`. Edited reminders are not removed from the heap,
+    their old entries are recognized as stale when popped. Changes made in this process wake the scheduler
+    immediately, changes made by other processes (web workers, admin panel) bump a version in the shared cache,
+    which the scheduler checks every RESYNC_INTERVAL seconds before reloading the pending reminders.
+    """
+
+    _instances = set()  # Schedulers running in this process, woken up directly by the signals
+
+    def __init__(self, sink: ReminderSink):
+        self.sink = sink
+        self._heap = []  # (due time, reminder id)
+        self._pending = {}  # reminder id -> (due time, date_time of the reminder when it was loaded)
+        self._version = None
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    @staticmethod
+    def current_version():
+        return cache.get(REMINDERS_VERSION_CACHE_KEY, 0)
+
+    @classmethod
+    def notify_changed(cls):
+        """
+        Tell all schedulers that reminders were added, edited or deleted.
+        """
+        try:
+            cache.incr(REMINDERS_VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(REMINDERS_VERSION_CACHE_KEY, 1, None)
+        for scheduler in list(cls._instances):
+            scheduler._wakeup.set()
+
+    def load(self, now: Optional[datetime] = None):
+        """
+        Replace the schedule with all reminders not sent yet.
+
+        Reminders waiting for a retry keep their retry time unless they were edited. Reminders missed by more than
+        the grace period, including ones whose retries failed for that long, are logged and marked as pinged,
+        so that they are not considered again.
+        """
+        now = now or timezone.now()
+        self._version = self.current_version()
+        expired = Reminder.objects.filter(pinged=False, date_time__lt=now - REMINDER_GRACE_PERIOD)
+        expired_ids = list(expired.values_list('id', flat=True))
+        if expired_ids:
+            logger.warning("Giving up reminders %s missed by more than %s", expired_ids, REMINDER_GRACE_PERIOD)
+            Reminder.objects.filter(id__in=expired_ids, pinged=False).update(pinged=True, updated_at=timezone.now())
+            bump_model_version(Reminder)
+
+        reminders = (Reminder.objects.filter(pinged=False, date_time__gte=now - REMINDER_GRACE_PERIOD)
+                     .values_list('id', 'date_time'))
+        previous = self._pending
+        self._pending = {}
+        for reminder_id, date_time in reminders:
+            due, loaded_date_time = previous.get(reminder_id, (date_time, date_time))
+            self._pending[reminder_id] = (due if loaded_date_time == date_time else date_time, date_time)
+        self._heap = [(due, reminder_id) for reminder_id, (due, _) in self._pending.items()]
+        heapq.heapify(self._heap)
+
+    def next_due(self) -> Optional[datetime]:
+        while self._heap:
+            due, reminder_id = self._heap[0]
+            if reminder_id in self._pending and self._pending[reminder_id][0] == due:
+                return due
+            heapq.heappop(self._heap)  # Stale entry of a rescheduled reminder
+        return None
+
+    def dispatch_due(self, now: Optional[datetime] = None) -> int:
+        """
+        Send all reminders whose time has come.
+
+        A reminder is marked as pinged with a conditional update before it is sent, so it is delivered
+        by only one scheduler even if several are running, and not at all if it was edited in the meantime.
+        If the sink fails, the flag is cleared again and the reminder is retried after RETRY_DELAY.
+
+        Returns:
+            int: Number of sent reminders.
+        """
+        now = now or timezone.now()
+        sent = 0
+        while (due := self.next_due()) is not None and due <= now:
+            _, reminder_id = heapq.heappop(self._heap)
+            _, date_time = self._pending.pop(reminder_id)
+            if not (Reminder.objects.filter(id=reminder_id, pinged=False, date_time=date_time)
+                    .update(pinged=True, updated_at=timezone.now())):
+                continue  # Sent by someone else, edited or deleted, the next load picks up the current state
+            bump_model_version(Reminder)
+            reminder = Reminder.objects.get(id=reminder_id)
+            try:
+                self.sink.send(reminder, RemindersSerializer(reminder).data)
+            except Exception:
+                logger.exception("Sending reminder %s failed, retrying in %s", reminder_id, RETRY_DELAY)
+                Reminder.objects.filter(id=reminder_id).update(pinged=False, updated_at=timezone.now())
+                bump_model_version(Reminder)
+                self._pending[reminder_id] = (now + RETRY_DELAY, date_time)
+                heapq.heappush(self._heap, (now + RETRY_DELAY, reminder_id))
+                continue
+            sent += 1
+        return sent
+
+    def seconds_to_next(self, now: Optional[datetime] = None) -> Optional[float]:
+        due = self.next_due()
+        if due is None:
+            return None
+        return max(0.0, (due - (now or timezone.now())).total_seconds())
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def run(self):
+        """
+        Dispatch reminders until stop() is called.
+        """
+        self._instances.add(self)
+        try:
+            while not self._stopped:
+                self._wakeup.clear()
+                if self.current_version() != self._version:
+                    self.load()
+                self.dispatch_due()
+                timeout = self.seconds_to_next()
+                self._wakeup.wait(RESYNC_INTERVAL if timeout is None else min(timeout, RESYNC_INTERVAL))
+        finally:
+            self._instances.discard(self)
@@ -41,3 +41,38 @@ class DisplaySeminarSerializer(serializers.ModelSerializer):
         fields = ['id', 'date', 'time', 'duration', 'group_name', 'theme', 'description', 'image', 'file',
                   'discord_channel_id','discord_voice_channel_id', 'group_role_id', 'started', 'finished', 'featured', 'special_guest',
                   'tutors', 'difficulty_label', 'difficulty_icon', 'form']
+
+
+class PrimaryKeyListField(serializers.ListField):
+    child = serializers.IntegerField()
+
+    def to_representation(self, data):
+        return [obj.pk for obj in data.all()]
+
+
+class BulkSeminarSerializer(serializers.ModelSerializer):
+    """
+    Seminar as a row of a bulk import or export.
+
+    Related objects are plain ids, checked for existence by the bulk import in one query per relation
+    instead of one query per row, and files are their stored names.
+    """
+    id = serializers.IntegerField(required=False, allow_null=True)
+    group = serializers.IntegerField(source='group_id', required=False, allow_null=True)
+    form = serializers.IntegerField(source='form_id', required=False, allow_null=True)
+    tutors = PrimaryKeyListField(required=False)
+    image = serializers.CharField(required=False, allow_blank=True, allow_null=True, max_length=100)
+    file = serializers.CharField(required=False, allow_blank=True, allow_null=True, max_length=100)
+
+    class Meta:
+        model = Seminar
+        fields = ['id', 'date', 'time', 'duration', 'theme', 'description', 'group', 'form', 'difficulty', 'tutors',
+                  'discord_channel_id', 'discord_voice_channel_id', 'started', 'finished', 'featured',
+                  'special_guest', 'image', 'file']
+
+    def validate(self, attrs):
+        # Rows are written with bulk_create, a violated constraint would abort the whole batch.
+        # Partial rows without `started` are checked against the stored seminar by validate_seminar_rows.
+        if attrs.get('finished') and not attrs.get('started', self.partial):
+            raise serializers.ValidationError("A finished seminar must have been started.")
+        return attrs
@@ -1,23 +1,74 @@
 from datetime import timedelta, datetime
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models import Case, Value, When
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver, Signal
+from django.utils import timezone
 from .models import Seminar, Reminder
+from mikosite.versioning import bump_model_version
+from .reminders import ReminderScheduler
 
 hours_before_seminar_to_invite = 1
 hours_after_seminar_to_feedback = 0
 
+# Sent after seminars were created with bulk_create, which sends no post_save signals. Arguments: seminars
+seminars_imported = Signal()
+
+
+def reminder_times(seminar: Seminar) -> dict:
+    """
+    Times of the reminders of a seminar, by reminder type.
+    """
+    start = timezone.make_aware(datetime.combine(seminar.date, seminar.time))
+    return {
+        "invite": start - timedelta(hours=hours_before_seminar_to_invite),
+        "feedback": start + seminar.duration + timedelta(hours=hours_after_seminar_to_feedback),
+    }
+
+
+def build_reminders(seminar: Seminar) -> list[Reminder]:
+    """
+    Unsaved reminders of a saved seminar.
+    """
+    return [Reminder(seminar=seminar, type=reminder_type, date_time=date_time)
+            for reminder_type, date_time in reminder_times(seminar).items()]
+
+
 @receiver(post_save, sender=Seminar)
 def create_reminders_for_seminar(sender, instance, created, **kwargs):
     if created:
-        reminder_date = datetime.combine(instance.date, instance.time)- timedelta(hours=hours_before_seminar_to_invite)
-        Reminder.objects.create(seminar=instance,type="invite", date_time=reminder_date)
-        reminder_date = datetime.combine(instance.date, instance.time) + instance.duration + timedelta(hours=hours_after_seminar_to_feedback)
-        Reminder.objects.create(seminar=instance, type="feedback", date_time=reminder_date)
+        Reminder.objects.bulk_create(build_reminders(instance))
     else:
-        for reminder in instance.reminder.all():
-            if reminder.type == "invite":
-                reminder.date_time = datetime.combine(instance.date,instance.time) - timedelta(hours=hours_before_seminar_to_invite)
-                reminder.save()
-            if reminder.type == "feedback":
-                reminder.date_time = datetime.combine(instance.date, instance.time) + instance.duration + timedelta(hours=hours_after_seminar_to_feedback)
-                reminder.save()
+        # One UPDATE moving all reminders of the seminar, whatever their number
+        times = reminder_times(instance)
+        instance.reminder.filter(type__in=times).update(
+            date_time=Case(*[When(type=reminder_type, then=Value(date_time))
+                             for reminder_type, date_time in times.items()]),
+            updated_at=timezone.now(),
+        )
+    # bulk_create and update send no Reminder signals
+    ReminderScheduler.notify_changed()
+    bump_model_version(Reminder)
+
+
+@receiver(seminars_imported)
+def notify_reminders_imported(sender, **kwargs):
+    ReminderScheduler.notify_changed()
+    bump_model_version(Seminar, Reminder)
+
+
+@receiver(m2m_changed, sender=Seminar.tutors.through)
+def touch_seminars(sender, instance, action, reverse, pk_set, **kwargs):
+    # Changing tutors does not save the seminar, bump its update time for the change feed
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Seminar.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+    elif action in ('post_add', 'post_remove'):
+        Seminar.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+    elif action == 'pre_clear':
+        Seminar.objects.filter(tutors=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Reminder)
+@receiver(post_delete, sender=Reminder)
+def notify_reminder_scheduler(sender, **kwargs):
+    ReminderScheduler.notify_changed()
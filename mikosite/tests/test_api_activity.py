@@ -1,9 +1,15 @@
+from datetime import timedelta
 from random import seed, randint
 
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 
-from accounts.models import User, ActivityScore
+from accounts.models import User, ActivityScore, DailyActivityScore
 
 
 class ActivityScoreViewSetTests(APITestCase):
@@ -133,3 +139,115 @@ class UserActivityViewSetTests(APITestCase):
         response = self.client.get(f'/api/user-activity/{dummy_user.id}/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['total_score'], 0)
+
+
+class ActivityScoreTotalsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='userpass', email='user1@test.com')
+        self.other = User.objects.create_user(username='user2', password='userpass', email='user2@test.com')
+
+    def assertTotals(self, user, total_score, score_entries):
+        user.refresh_from_db()
+        self.assertEqual((user.total_score, user.score_entries), (total_score, score_entries))
+
+    def test_totals_follow_scores(self):
+        score = ActivityScore.objects.create(user=self.user, change=10, reason='a')
+        ActivityScore.objects.bulk_create([ActivityScore(user=self.user, change=5, reason='b'),
+                                           ActivityScore(user=self.other, change=7, reason='c')])
+        self.assertTotals(self.user, 15, 2)
+        self.assertTotals(self.other, 7, 1)
+
+        score.change = 3
+        score.save()
+        self.assertTotals(self.user, 8, 2)
+
+        score.user = self.other
+        score.save()
+        self.assertTotals(self.user, 5, 1)
+        self.assertTotals(self.other, 10, 2)
+
+        score.delete()
+        self.assertTotals(self.other, 7, 1)
+        ActivityScore.objects.filter(user=self.user).delete()
+        self.assertTotals(self.user, 0, 0)
+
+    def test_queryset_delete_updates_totals_once(self):
+        now = timezone.now()
+        ActivityScore.objects.bulk_create([ActivityScore(user=self.user, change=i, reason='a', timestamp=now)
+                                           for i in range(20)])
+        with CaptureQueriesContext(connection) as queries:
+            ActivityScore.objects.filter(user=self.user).delete()
+        self.assertLess(len(queries), 10)
+        self.assertTotals(self.user, 0, 0)
+        self.assertEqual(DailyActivityScore.objects.get(user=self.user).entries, 0)
+
+    def test_reconcile_scores(self):
+        ActivityScore.objects.create(user=self.user, change=10, reason='a')
+        ActivityScore.objects.filter(user=self.user).update(change=4)
+        User.objects.filter(pk=self.other.pk).update(total_score=100, score_entries=3)
+
+        call_command('reconcilescores')
+        self.assertTotals(self.user, 4, 1)
+        self.assertTotals(self.other, 0, 0)
+        self.assertEqual(User.reconcile_scores(), 0)
+
+    def test_leaderboard_reads_running_totals(self):
+        admin = User.objects.create_superuser(username='admin', password='adminpass', email='admin@test.com')
+        ActivityScore.objects.create(user=self.user, change=10, reason='a')
+        ActivityScore.objects.create(user=self.other, change=20, reason='b')
+        self.client.force_login(admin)
+        with self.assertNumQueries(4):  # Session, user, count and page
+            response = self.client.get('/api/user-activity/')
+        self.assertEqual([user['username'] for user in response.data['results']], ['user2', 'user1'])
+
+
+class WindowedLeaderboardTests(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass', email='admin@test.com')
+        self.users = [User.objects.create_user(username=f'user{i}', password='userpass', email=f'user{i}@test.com')
+                      for i in range(3)]
+        now = timezone.now()
+        ActivityScore.objects.bulk_create([
+            ActivityScore(user=self.users[0], change=50, reason='a', timestamp=now - timedelta(days=400)),
+            ActivityScore(user=self.users[1], change=5, reason='b', timestamp=now),
+            ActivityScore(user=self.users[2], change=3, reason='c', timestamp=now),
+        ])
+        self.recent = ActivityScore.objects.create(user=self.users[2], change=4, reason='d', timestamp=now)
+        self.client.login(username='admin', password='adminpass')
+
+    def leaderboard(self, params):
+        response = self.client.get('/api/user-activity/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(user['username'], user['total_score']) for user in response.data['results']]
+
+    def test_windows(self):
+        self.assertEqual(self.leaderboard({}), [('user0', 50), ('user2', 7), ('user1', 5)])
+        for window in ('week', 'month', 'season'):
+            self.assertEqual(self.leaderboard({'window': window}), [('user2', 7), ('user1', 5)])
+        old_date = timezone.localdate() - timedelta(days=400)
+        self.assertEqual(self.leaderboard({'start_date': old_date.isoformat(), 'end_date': old_date.isoformat()}),
+                         [('user0', 50)])
+
+    def test_rollups_follow_deletes(self):
+        self.recent.delete()
+        self.assertEqual(self.leaderboard({'window': 'week'}), [('user1', 5), ('user2', 3)])
+        ActivityScore.objects.filter(user=self.users[1]).delete()
+        self.assertEqual(self.leaderboard({'window': 'week'}), [('user2', 3)])
+
+    def test_retrieve_window(self):
+        response = self.client.get(f'/api/user-activity/{self.users[0].id}/', {'window': 'month'})
+        self.assertEqual(response.data['total_score'], 0)
+        response = self.client.get(f'/api/user-activity/{self.users[2].id}/', {'window': 'month'})
+        self.assertEqual(response.data['total_score'], 7)
+
+    def test_invalid_window(self):
+        self.assertEqual(self.client.get('/api/user-activity/', {'window': 'year'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/user-activity/', {'start_date': 'yesterday'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_daily_scores(self):
+        expected = set(DailyActivityScore.objects.filter(entries__gt=0).values_list('user', 'date', 'total'))
+        DailyActivityScore.objects.all().delete()
+        call_command('reconcilescores', '--rollups')
+        self.assertEqual(set(DailyActivityScore.objects.values_list('user', 'date', 'total')), expected)
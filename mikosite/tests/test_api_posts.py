@@ -181,3 +181,28 @@ class PostViewSetTests(APITestCase):
 
 class PostImageViewSetTests(APITestCase):
     pass
+
+
+class PostListQueryBudgetTests(APITestCase):
+    def setUp(self):
+        authors = User.objects.bulk_create(
+            [User(username=f'author{i}', email=f'author{i}@test.com', name='Anna', surname=f'Kowalska{i}')
+             for i in range(3)])
+        images = Image.objects.bulk_create([Image(image=f'/path/to/image{i}.jpg') for i in range(3)])
+        posts = Post.objects.bulk_create(
+            [Post(title=f"Post {i}", date=date(2024, 1, 1), time=time(12, 0)) for i in range(20)])
+        Post.authors.through.objects.bulk_create(
+            [Post.authors.through(post=post, user=author) for post in posts for author in authors[:2]])
+        Post.images.through.objects.bulk_create(
+            [Post.images.through(post=post, image=image) for post in posts for image in images])
+
+    def test_list_query_budget(self):
+        # Count, page, authors and images, no matter how many posts are on the page
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/posts/', {'limit': 200})
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(len(response.data['results'][0]['images']), 3)
+
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/posts/', {'limit': 200, 'display_only': '1'})
+        self.assertEqual(response.data['results'][0]['authors'], ['Anna Kowalska0', 'Anna Kowalska1'])
@@ -1,10 +1,14 @@
+import json
 from datetime import date, time, datetime, timedelta
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 
 from accounts.models import User
-from seminars.models import Seminar, SeminarGroup
+from seminars.models import Reminder, Seminar, SeminarGroup
 
 
 class SeminarViewSetTests(APITestCase):
@@ -323,3 +327,142 @@ class SeminarGroupViewSetTests(APITestCase):
         response = self.client.delete(f'/api/seminar-groups/{self.group2.id}/')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(SeminarGroup.objects.count(), 2)
+
+
+class SeminarBulkApiTests(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass', email='admin@test.com')
+        self.tutors = [User.objects.create_user(username=f'tutor{i}', password='userpass', email=f'tutor{i}@test.com')
+                       for i in range(3)]
+        self.group = SeminarGroup.objects.create(name='Test Group')
+        self.client.login(username='admin', password='adminpass')
+
+    def semester(self, count):
+        return [{'date': str(date(2030, 1, 1) + timedelta(days=7 * i)), 'time': '18:00', 'duration': '01:30:00',
+                 'theme': f'Seminar {i}', 'group': self.group.id, 'difficulty': 2,
+                 'tutors': [tutor.id for tutor in self.tutors[:i % 3]]} for i in range(count)]
+
+    def post_lines(self, rows):
+        body = '\n'.join(json.dumps(row) for row in rows)
+        return self.client.post('/api/seminars/bulk/', body, content_type='application/jsonl')
+
+    def test_bulk_create(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_lines(self.semester(30))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'created': 30, 'updated': 0})
+        self.assertLess(len(queries), 20)
+
+        self.assertEqual(Seminar.objects.count(), 30)
+        self.assertEqual(Reminder.objects.count(), 60)
+        seminar = Seminar.objects.get(theme='Seminar 2')
+        self.assertEqual(seminar.group, self.group)
+        self.assertEqual(set(seminar.tutors.all()), set(self.tutors[:2]))
+
+    def test_bulk_update(self):
+        self.post_lines(self.semester(5))
+        rows = [json.loads(line) for line in self.client.get('/api/seminars/export/').getvalue().decode().splitlines()]
+        for row in rows:
+            row['time'] = '16:00'
+            row['tutors'] = [self.tutors[2].id]
+        response = self.post_lines(rows)
+        self.assertEqual(response.data, {'created': 0, 'updated': 5})
+
+        seminar = Seminar.objects.get(theme='Seminar 1')
+        self.assertEqual(seminar.time, time(16, 0))
+        self.assertEqual(list(seminar.tutors.all()), [self.tutors[2]])
+        invite = seminar.reminder.get(type='invite')
+        self.assertEqual(timezone.localtime(invite.date_time).time(), time(15, 0))
+
+    def test_bulk_update_keeps_omitted_fields(self):
+        self.post_lines(self.semester(2))
+        seminar = Seminar.objects.get(theme='Seminar 1')
+        Seminar.objects.filter(pk=seminar.pk).update(description='Opis', started=True, special_guest=True)
+        response = self.post_lines([{'id': seminar.id, 'time': '16:00'}, {'id': seminar.id, 'finished': True}])
+        self.assertEqual(response.data, {'created': 0, 'updated': 2})
+
+        seminar.refresh_from_db()
+        self.assertEqual(seminar.time, time(16, 0))
+        self.assertEqual((seminar.theme, seminar.description, seminar.special_guest), ('Seminar 1', 'Opis', True))
+        self.assertEqual(seminar.group, self.group)
+        self.assertTrue(seminar.finished)
+        self.assertEqual(list(seminar.tutors.all()), [self.tutors[0]])
+        invite = seminar.reminder.get(type='invite')
+        self.assertEqual(timezone.localtime(invite.date_time).time(), time(15, 0))
+
+    def test_bulk_update_checks_stored_started(self):
+        self.post_lines(self.semester(1))
+        seminar = Seminar.objects.get()
+        response = self.post_lines([{'id': seminar.id, 'finished': True}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Seminar.objects.get().finished)
+
+    def test_csv_round_trip(self):
+        self.post_lines(self.semester(4))
+        export = self.client.get('/api/seminars/export/', {'as': 'csv'})
+        self.assertEqual(export['Content-Type'], 'text/csv')
+        content = export.getvalue().decode()
+        self.assertEqual(len(content.splitlines()), 5)
+
+        Seminar.objects.all().delete()
+        content = content.replace('\r\n', '\n').split('\n', 1)
+        header, body = content[0], content[1]
+        # Drop the ids, so that the seminars are created again
+        body = '\n'.join(line.split(',', 1)[1] for line in body.splitlines())
+        header = header.split(',', 1)[1]
+        response = self.client.post('/api/seminars/bulk/', header + '\n' + body, content_type='text/csv')
+        self.assertEqual(response.data, {'created': 4, 'updated': 0})
+        self.assertEqual(set(Seminar.objects.get(theme='Seminar 1').tutors.all()), {self.tutors[0]})
+
+    def test_csv_with_charset(self):
+        header = 'date,time,duration,theme,group,difficulty,tutors'
+        body = f'2030-01-01,18:00,01:30:00,Grafy,{self.group.id},2,{self.tutors[0].id};{self.tutors[1].id}'
+        response = self.client.post('/api/seminars/bulk/', header + '\n' + body,
+                                    content_type='text/csv; charset=utf-8')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'created': 1, 'updated': 0})
+        self.assertEqual(set(Seminar.objects.get(theme='Grafy').tutors.all()), set(self.tutors[:2]))
+
+    def test_invalid_rows_rejected(self):
+        rows = self.semester(3)
+        rows[1]['tutors'] = [0]
+        rows[2]['duration'] = 'long'
+        response = self.post_lines(rows)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['row'] for error in response.data['errors']], [3])
+        self.assertFalse(Seminar.objects.exists())
+
+        rows[2]['duration'] = '01:00:00'
+        response = self.post_lines(rows)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2])
+
+        response = self.client.post('/api/seminars/bulk/', '{"theme": ', content_type='application/jsonl')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_requires_admin(self):
+        self.client.logout()
+        self.assertEqual(self.post_lines(self.semester(1)).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get('/api/seminars/export/').status_code, status.HTTP_200_OK)
+
+
+class SeminarListQueryBudgetTests(APITestCase):
+    def setUp(self):
+        tutors = User.objects.bulk_create(
+            [User(username=f'tutor{i}', email=f'tutor{i}@test.com', name='Jan', surname=f'Nowak{i}') for i in range(3)])
+        groups = SeminarGroup.objects.bulk_create([SeminarGroup(name=f'Grupa {i}') for i in range(3)])
+        seminars = Seminar.objects.bulk_create(
+            [Seminar(date=date(2024, 1, 1) + timedelta(days=i), time=time(18, 0), duration=timedelta(hours=1),
+                     group=groups[i % 3], theme=f"Seminar {i}") for i in range(20)])
+        Seminar.tutors.through.objects.bulk_create(
+            [Seminar.tutors.through(seminar=seminar, user=tutor) for seminar in seminars for tutor in tutors[:2]])
+
+    def test_list_query_budget(self):
+        # Count, page and tutors, no matter how many seminars are on the page
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/seminars/', {'limit': 200})
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(len(response.data['results'][0]['tutors']), 2)
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/seminars/', {'limit': 200, 'display_only': '1'})
+        self.assertEqual(response.data['results'][0]['tutors'], ['Jan Nowak0', 'Jan Nowak1'])
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from mikosite import caching
+from mikosite.caching import get_or_compute, invalidate, peek
+
+
+@override_settings(CACHE_REFRESH_IN_BACKGROUND=False)
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.compute = mock.Mock(side_effect=[1, 2, 3])
+
+    def test_fresh_value_is_not_recomputed(self):
+        self.assertEqual(get_or_compute('key', self.compute, 60), 1)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 1)
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_invalidate_recomputes_value(self):
+        get_or_compute('key', self.compute, 60)
+        invalidate('key')
+        self.assertEqual(get_or_compute('key', self.compute, 60), 2)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 2)
+
+    def test_expired_value_is_recomputed(self):
+        get_or_compute('key', self.compute, lambda value: -1, hard_ttl=60)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 2)
+
+    def test_stale_value_served_while_locked(self):
+        get_or_compute('key', self.compute, 60)
+        invalidate('key')
+        self.assertIsNotNone(caching._acquire_lock('key'))
+        self.assertEqual(get_or_compute('key', self.compute, 60), 1)
+        self.assertEqual(self.compute.call_count, 1)
+        self.assertEqual(peek('key'), 1)
+
+    def test_waits_for_value_computed_by_lock_holder(self):
+        caching._acquire_lock('key')
+        with mock.patch.object(caching, 'LOCK_WAIT', 0.1):
+            self.assertEqual(get_or_compute('key', self.compute, 60), 1)
+        self.assertIsNone(peek('key'))
+
+    @override_settings(CACHE_REFRESH_IN_BACKGROUND=True)
+    def test_refresh_in_background(self):
+        get_or_compute('key', self.compute, 60)
+        invalidate('key')
+        with mock.patch.object(caching._refresh_executor, 'submit') as submit:
+            self.assertEqual(get_or_compute('key', self.compute, 60), 1)
+        submit.assert_called_once()
+        caching._compute_and_store(*submit.call_args.args[1:])
+        self.assertEqual(get_or_compute('key', self.compute, 60), 2)
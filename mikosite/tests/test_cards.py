@@ -0,0 +1,183 @@
+import io
+import tempfile
+from datetime import date, time, timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from PIL import Image
+
+from cards import cards, views
+from cards.management.commands import updatecards
+from cards.static_cards import STATIC_CARDS
+from mainSite.models import Post
+from seminars.models import Seminar, SeminarGroup
+
+
+class CardViewTests(TestCase):
+    def setUp(self):
+        self.media_dir = tempfile.TemporaryDirectory()
+        template_path = Path(self.media_dir.name) / 'template.png'
+        Image.new('RGB', (cards.CARD_WIDTH, cards.CARD_HEIGHT), cards.BG_COLOR).save(template_path)
+        patcher = mock.patch.object(cards, 'TEMPLATE_PATH', str(template_path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.media_dir.cleanup)
+        self.addCleanup(cards.render_context.reset)
+        cards.render_context.reset()
+
+        self.post = Post.objects.create(title="Nowy semestr", subtitle="Zapisy na zajęcia koła już otwarte!",
+                                        date=date(2024, 9, 1), time=time(12, 0))
+        group = SeminarGroup.objects.create(name="Grupa olimpijska")
+        self.seminar = Seminar.objects.create(theme="Nierówności", date=date(2024, 10, 1), time=time(18, 0),
+                                              duration=timedelta(hours=1), group=group)
+        self.url = f'/cards/post-{self.post.pk}.png'
+
+    def test_renders_and_stores_card(self):
+        with mock.patch.object(views, 'render_card_png', wraps=cards.render_card_png) as render:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'image/png')
+            self.assertIn('ETag', response)
+            self.assertIn('Last-Modified', response)
+            self.assertTrue((Path(self.media_dir.name) / f'post-{self.post.pk}.png').exists())
+
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content)[:8], b'\x89PNG\r\n\x1a\n')
+        self.assertEqual(render.call_count, 1)
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_rerendered_after_change(self):
+        etag = self.client.get(self.url)['ETag']
+        self.post.title = "Nowy semestr 2024/25"
+        self.post.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_hash_covers_renderer_and_font(self):
+        content_hash = cards.render_context.content_hash("Tytuł", "Opis")
+        with mock.patch.object(cards, 'CARD_RENDERER_VERSION', cards.CARD_RENDERER_VERSION + 1):
+            self.assertNotEqual(cards.render_context.content_hash("Tytuł", "Opis"), content_hash)
+
+        font_path = Path(self.media_dir.name) / 'font.ttf'
+        font_path.write_bytes(Path(cards.FONT_PATH).read_bytes() + b'\0')
+        with mock.patch.object(cards, 'FONT_PATH', str(font_path)):
+            cards.render_context.reset()
+            self.assertNotEqual(cards.render_context.content_hash("Tytuł", "Opis"), content_hash)
+
+    def test_seminar_card(self):
+        response = self.client.get(f'/cards/seminar-{self.seminar.pk}.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+    def test_missing_object(self):
+        self.assertEqual(self.client.get('/cards/post-0.png').status_code, 404)
+
+    def test_title_too_long(self):
+        self.post.title = "bardzo długi tytuł " * 20
+        self.post.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_written_atomically(self):
+        with mock.patch.object(cards.os, 'replace', wraps=cards.os.replace) as replace:
+            self.client.get(self.url)
+        temp_path, output_path = replace.call_args.args
+        self.assertEqual(Path(temp_path).parent, Path(self.media_dir.name))
+        self.assertEqual(Path(output_path), Path(self.media_dir.name) / f'post-{self.post.pk}.png')
+        self.assertEqual(sorted(path.name for path in Path(self.media_dir.name).iterdir()),
+                         sorted(['template.png', f'post-{self.post.pk}.png']))
+
+    def test_missing_template_serves_stale_card(self):
+        self.client.get(self.url)
+        Path(cards.TEMPLATE_PATH).unlink()
+        cards.render_context.reset()
+        self.post.title = "Nowy semestr 2024/25"
+        self.post.save()
+        with mock.patch.object(cards, 'update_template') as update_template:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('ETag', response)
+            self.assertEqual(b''.join(response.streaming_content)[:8], b'\x89PNG\r\n\x1a\n')
+            self.assertEqual(self.client.get(f'/cards/seminar-{self.seminar.pk}.png').status_code, 404)
+        update_template.assert_not_called()
+
+
+class UpdateCardsCommandTests(TestCase):
+    def setUp(self):
+        self.media_dir = tempfile.TemporaryDirectory()
+        template_path = Path(self.media_dir.name) / 'template.png'
+        Image.new('RGB', (cards.CARD_WIDTH, cards.CARD_HEIGHT), cards.BG_COLOR).save(template_path)
+        for module in (cards, updatecards):
+            patcher = mock.patch.object(module, 'TEMPLATE_PATH', str(template_path))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.media_dir.cleanup)
+        self.addCleanup(cards.render_context.reset)
+        cards.render_context.reset()
+
+    def test_failed_card_does_not_stop_others(self):
+        broken = STATIC_CARDS[0][0]
+
+        def render(title, description, filename, force):
+            if filename == broken:
+                raise OSError("Disk full")
+            return cards.render_social_card(title, description, filename=filename, force=force)
+
+        with mock.patch.object(updatecards, 'render_social_card', side_effect=render), \
+                mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            with self.assertRaises(CommandError):
+                call_command('updatecards', '--static-only', '--jobs', '1')
+        self.assertIn(f"Rendering {broken} failed with OSError: Disk full", stdout.getvalue())
+        for filename, _, _ in STATIC_CARDS[1:]:
+            self.assertTrue((Path(self.media_dir.name) / filename).exists())
+
+
+class TextWrappingTests(TestCase):
+    def setUp(self):
+        self.title_font = cards.get_font(60, 'SemiBold')
+        self.desc_font = cards.get_font(40)
+
+    def test_short_title(self):
+        self.assertEqual(cards.wrap_title_text("Grafy", self.title_font, 680), ("Grafy", 1))
+
+    def test_balanced_title(self):
+        title = "Zasada szufladkowa Dirichleta w zadaniach"
+        wrapped, line_count = cards.wrap_title_text(title, self.title_font, 680)
+        self.assertEqual(line_count, 2)
+        self.assertEqual(wrapped.replace('\n', ' '), title)
+        line1, line2 = wrapped.split('\n')
+        best = min(max(self.title_font.getlength(' '.join(title.split()[:pos])),
+                       self.title_font.getlength(' '.join(title.split()[pos:])))
+                   for pos in range(1, len(title.split())))
+        self.assertEqual(max(self.title_font.getlength(line1), self.title_font.getlength(line2)), best)
+
+    def test_title_too_long(self):
+        with self.assertRaises(ValueError):
+            cards.wrap_title_text("Nierówności " * 12, self.title_font, 680)
+
+    def test_word_width_cache_bounded(self):
+        cards.measure_words([f"słowo{i}" for i in range(cards.WORD_WIDTH_CACHE_SIZE + 100)], self.desc_font)
+        self.assertEqual(cards._word_width.cache_info().currsize, cards.WORD_WIDTH_CACHE_SIZE)
+
+    def test_description_lines_fit(self):
+        description = ("Na zajęciach omówimy najważniejsze techniki dowodzenia, "
+                       "a potem przećwiczymy je na zadaniach z ostatnich lat.")
+        wrapped, line_count = cards.wrap_description_text(description, self.desc_font, 700)
+        lines = wrapped.split('\n')
+        self.assertEqual(len(lines), line_count)
+        self.assertEqual(' '.join(lines), description)
+        for line, next_line in zip(lines, lines[1:]):
+            self.assertLessEqual(self.desc_font.getlength(line), 700)
+            # Every line is as long as possible
+            self.assertGreater(self.desc_font.getlength(line + ' ' + next_line.split(' ')[0]), 700)
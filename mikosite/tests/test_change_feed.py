@@ -0,0 +1,136 @@
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from mainSite import changes
+from mainSite.changes import make_token, parse_token
+from mainSite.models import Post, Tombstone
+from seminars.bulk import update_seminars
+from seminars.models import Reminder, Seminar, SeminarGroup
+
+
+class ChangeFeedTests(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass', email='admin@test.com')
+        self.group = SeminarGroup.objects.create(name='Grupa')
+        self.seminar = Seminar.objects.create(date=date(2030, 1, 1), time=time(18, 0), duration=timedelta(hours=1),
+                                              group=self.group, theme="Seminarium")
+        self.other_seminar = Seminar.objects.create(date=date(2030, 1, 2), time=time(18, 0),
+                                                    duration=timedelta(hours=1), theme="Inne")
+        self.post = Post.objects.create(title="Post", date=date(2024, 1, 1), time=time(12, 0))
+        self.client.force_authenticate(self.admin_user)
+
+    def sync(self, token=None):
+        response = self.client.get('/api/changes/', {'since': token} if token else {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def later(self, minutes):
+        return mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=minutes))
+
+    def test_full_sync(self):
+        data = self.sync()
+        self.assertEqual({seminar['id'] for seminar in data['seminars']}, {self.seminar.id, self.other_seminar.id})
+        self.assertEqual(len(data['reminders']), 4)
+        self.assertEqual([post['id'] for post in data['posts']], [self.post.id])
+        self.assertEqual(data['deleted']['seminars'], [])
+
+    def test_incremental_sync(self):
+        post_id = self.post.id
+        with self.later(5):
+            token = self.sync()['token']
+        with self.later(10):
+            self.seminar.theme = "Zmienione"
+            self.seminar.save()
+            self.other_seminar.tutors.add(self.admin_user)
+            self.post.delete()
+        with self.later(11):
+            data = self.sync(token)
+
+        self.assertEqual({seminar['id'] for seminar in data['seminars']}, {self.seminar.id, self.other_seminar.id})
+        self.assertEqual({reminder['seminar'] for reminder in data['reminders']}, {self.seminar.id})
+        self.assertEqual(data['posts'], [])
+        self.assertEqual(data['seminar_groups'], [])
+        self.assertEqual(data['deleted']['posts'], [post_id])
+
+        with self.later(20):
+            data = self.sync(data['token'])
+        self.assertEqual((data['seminars'], data['deleted']['posts']), ([], []))
+
+    def test_bulk_update_bumps_updated_at(self):
+        with self.later(5):
+            token = self.sync()['token']
+        with self.later(10):
+            update_seminars([self.seminar], [[self.admin_user.id]])
+            data = self.sync(token)
+        self.assertEqual([seminar['id'] for seminar in data['seminars']], [self.seminar.id])
+        self.assertEqual(len(data['reminders']), 2)
+
+    def test_deleting_seminar_deletes_reminders(self):
+        seminar_id = self.seminar.id
+        reminder_ids = set(self.seminar.reminder.values_list('id', flat=True))
+        with self.later(5):
+            token = self.sync()['token']
+        with self.later(10):
+            self.seminar.delete()
+            data = self.sync(token)
+        self.assertEqual(data['deleted']['seminars'], [seminar_id])
+        self.assertEqual(set(data['deleted']['reminders']), reminder_ids)
+
+    def sync_pages(self, token=None):
+        pages = [self.sync(token)]
+        while pages[-1]['more']:
+            pages.append(self.sync(pages[-1]['token']))
+        return pages
+
+    def test_paged_full_sync(self):
+        Seminar.objects.bulk_create([Seminar(date=date(2030, 2, 1), time=time(18, 0), duration=timedelta(hours=1),
+                                             theme=f"Seminarium {i}") for i in range(7)])
+        with mock.patch.object(changes, 'CHANGES_PAGE_SIZE', 3), self.later(5):
+            pages = self.sync_pages()
+        self.assertTrue(all(sum(len(page[name]) for name in changes.CHANGE_FEEDS) <= 3 for page in pages))
+        seminar_ids = [seminar['id'] for page in pages for seminar in page['seminars']]
+        self.assertEqual(sorted(seminar_ids), sorted(Seminar.objects.values_list('id', flat=True)))
+        self.assertEqual(sum(len(page['reminders']) for page in pages), Reminder.objects.count())
+        self.assertEqual([post['id'] for page in pages for post in page['posts']], [self.post.id])
+        self.assertFalse(pages[-1]['more'])
+        self.assertNotIn('.', pages[-1]['token'])
+
+    def test_paged_incremental_sync_with_tombstones(self):
+        with self.later(5):
+            token = self.sync()['token']
+        with self.later(10):
+            reminder_ids = set(Reminder.objects.values_list('id', flat=True))
+            Reminder.objects.all().delete()
+            self.seminar.save()
+        with self.later(11), mock.patch.object(changes, 'CHANGES_PAGE_SIZE', 2):
+            pages = self.sync_pages(token)
+        self.assertEqual([seminar['id'] for page in pages for seminar in page['seminars']], [self.seminar.id])
+        self.assertEqual({reminder_id for page in pages for reminder_id in page['deleted']['reminders']},
+                         reminder_ids)
+        self.assertGreater(len(pages), 2)
+
+    def test_tokens(self):
+        now = timezone.now()
+        self.assertEqual(parse_token(make_token(now)), now)
+        for token in ('abc', '1.2.unknown..', '1.2.seminars'):
+            self.assertEqual(self.client.get('/api/changes/', {'since': token}).status_code,
+                             status.HTTP_400_BAD_REQUEST)
+        old_token = make_token(now - changes.TOMBSTONE_RETENTION - timedelta(days=1))
+        self.assertEqual(self.client.get('/api/changes/', {'since': old_token}).status_code, status.HTTP_410_GONE)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/changes/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_prune_tombstones(self):
+        self.post.delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - changes.TOMBSTONE_RETENTION - timedelta(days=1))
+        Reminder.objects.filter(seminar=self.seminar).first().delete()
+        call_command('prunetombstones')
+        self.assertEqual(list(Tombstone.objects.values_list('model', flat=True)), ['reminders'])
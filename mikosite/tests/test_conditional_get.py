@@ -0,0 +1,166 @@
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db.models.deletion import Collector
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import ActivityScore, DailyActivityScore, User
+from hintBase.models import ProblemLSHBucket
+from mainSite.models import Post
+from seminars.bulk import import_seminars
+from seminars.models import GoogleFormsTemplate, Seminar, SeminarGroup
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.tutor = User.objects.create_user(username='tutor', password='pass', email='tutor@test.com')
+        self.group = SeminarGroup.objects.create(name='Grupa')
+        self.seminar = Seminar.objects.create(date=date(2030, 1, 1), time=time(18, 0), duration=timedelta(hours=1),
+                                              group=self.group, theme="Seminarium")
+
+    def get(self, path='/api/seminars/', etag=None, **params):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(path, params, headers=headers)
+
+    def test_not_modified_without_queries(self):
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        last_modified = self.get()['Last-Modified']
+        response = self.client.get('/api/seminars/', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_invalidate_etag(self):
+        etag = self.get()['ETag']
+        for change in (lambda: self.seminar.save(),
+                       lambda: self.seminar.tutors.add(self.tutor),
+                       lambda: self.group.save(),
+                       lambda: import_seminars([Seminar(date=date(2030, 2, 1), time=time(18, 0),
+                                                        duration=timedelta(hours=1), theme="Nowe")])):
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            response = self.get(etag=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etag = response['ETag']
+
+    def test_receivers_only_for_versioned_models(self):
+        collector = Collector(using='default')
+        for model in (ProblemLSHBucket, DailyActivityScore, Session):
+            self.assertTrue(collector.can_fast_delete(model.objects.all()), model)
+        self.assertFalse(collector.can_fast_delete(Seminar.objects.all()))
+
+    def test_unrelated_changes_keep_etag(self):
+        etag = self.get('/api/seminar-groups/')['ETag']
+        self.seminar.save()
+        self.assertEqual(self.get('/api/seminar-groups/', etag=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_depends_on_request(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(etag=etag, display_only='1').status_code, status.HTTP_200_OK)
+        self.assertNotEqual(self.get(display_only='1')['ETag'], etag)
+
+        etag = self.get(f'/api/seminars/{self.seminar.id}/')['ETag']
+        self.assertEqual(self.get(f'/api/seminars/{self.seminar.id}/', etag=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+
+class TimeDependentConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass', email='admin@test.com')
+        self.client.force_authenticate(self.admin_user)
+
+    def test_leaderboard_window_rollover(self):
+        sunday = date(2030, 1, 6)
+        ActivityScore.objects.create(user=self.admin_user, change=5, reason='a',
+                                     timestamp=timezone.make_aware(datetime.combine(sunday, time(12, 0))))
+        with mock.patch('django.utils.timezone.localdate', return_value=sunday):
+            response = self.client.get('/api/user-activity/', {'window': 'week'})
+        self.assertEqual(len(response.data['results']), 1)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with mock.patch('django.utils.timezone.localdate', return_value=sunday + timedelta(days=1)):
+            response = self.client.get('/api/user-activity/', {'window': 'week'}, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['results'], [])
+            response = self.client.get('/api/user-activity/', {'window': 'week'},
+                                       headers={'If-Modified-Since': last_modified})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_next_reminder_not_conditional(self):
+        seminar = Seminar.objects.create(date=date(2030, 1, 1), time=time(18, 0), duration=timedelta(hours=1),
+                                         theme="Seminarium")
+        response = self.client.get('/api/reminders/', {'only_next': '1'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+        self.assertEqual({reminder['id'] for reminder in response.data['results']},
+                         {seminar.reminder.get(type='invite').id})
+        self.assertIn('ETag', self.client.get('/api/reminders/'))
+
+
+class DisplayResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.seminar = Seminar.objects.create(date=date(2030, 1, 1), time=time(18, 0), duration=timedelta(hours=1),
+                                              theme="Seminarium")
+        self.post = Post.objects.create(title="Post", date=date(2024, 1, 1), time=time(12, 0), content="*treść*")
+
+    def test_cached_display_lists_skip_queries(self):
+        for path in ('/api/seminars/', '/api/posts/'):
+            response = self.client.get(path, {'display_only': '1', 'limit': 10, 'offset': 0})
+            with self.assertNumQueries(0):
+                cached = self.client.get(f'{path}?offset=0&limit=10&display_only=1')
+            self.assertEqual(cached.status_code, status.HTTP_200_OK)
+            self.assertEqual(cached.json(), response.json())
+
+    def test_changes_invalidate_cached_lists(self):
+        self.client.get('/api/seminars/', {'display_only': '1'})
+        self.seminar.theme = "Zmienione"
+        self.seminar.save()
+        response = self.client.get('/api/seminars/', {'display_only': '1'})
+        self.assertEqual(response.data['results'][0]['theme'], "Zmienione")
+
+        self.client.get('/api/posts/', {'display_only': '1'})
+        self.post.authors.add(User.objects.create_user(username='autor', password='pass', email='autor@test.com'))
+        response = self.client.get('/api/posts/', {'display_only': '1'})
+        self.assertEqual(len(response.data['results'][0]['authors']), 1)
+
+    def test_logins_and_scores_keep_cached_lists(self):
+        tutor = User.objects.create_user(username='tutor', password='pass', email='tutor@test.com', name='Jan')
+        self.seminar.tutors.add(tutor)
+        self.client.get('/api/seminars/', {'display_only': '1'})
+        self.client.login(username='tutor', password='pass')
+        self.client.logout()
+        ActivityScore.objects.create(user=tutor, change=5, reason='a')
+        with self.assertNumQueries(0):
+            self.client.get('/api/seminars/', {'display_only': '1'})
+
+        tutor.surname = "Kowalski"
+        tutor.save()
+        response = self.client.get('/api/seminars/', {'display_only': '1'})
+        self.assertEqual(response.data['results'][0]['tutors'], ["Jan Kowalski"])
+
+    def test_deleted_form_invalidates_seminars(self):
+        form = GoogleFormsTemplate.objects.create(name="Ankieta", file='ankieta.json')
+        Seminar.objects.filter(pk=self.seminar.pk).update(form=form)
+        etag = self.client.get('/api/seminars/', {'display_only': '1'})['ETag']
+        form.delete()
+        response = self.client.get('/api/seminars/', {'display_only': '1'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['results'][0]['form'])
+
+    def test_default_lists_not_cached(self):
+        self.client.get('/api/seminars/')
+        with self.assertNumQueries(3):  # Count, page and tutors
+            self.client.get('/api/seminars/')
@@ -0,0 +1,390 @@
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from fuzzywuzzy import fuzz
+
+from accounts.models import User
+from hintBase.latex import latex_preview
+from hintBase.models import Problem, ProblemHint, ProblemLSHBucket, ProblemRating, Review
+from hintBase.search import (SQLITE_FTS_TRIGGERS, create_sqlite_search_triggers, filter_problems_by_tags,
+                             search_problems)
+from hintBase.similarity import LSH_BANDS, SIMILARITY_THRESHOLD, find_similar_problems
+from hintBase.pagination import keyset_page
+from hintBase.views import PROBLEMS_PER_PAGE, index, problem_list, view_problem, get_problem_detail_data
+
+
+class ProblemSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='userpass', email='author@test.com')
+
+        self.problem1 = Problem.objects.create(
+            latex_code="Udowodnij, że dla liczb rzeczywistych $a, b$ zachodzi nierówność $a^2 + b^2 \\geq 2ab$.",
+            source="OM 2020",
+            difficulty=2,
+            author=self.user,
+        )
+        self.problem2 = Problem.objects.create(
+            latex_code="Wyznacz wszystkie funkcje $f$ spełniające równanie funkcyjne. Równanie równanie równanie.",
+            source="OMJ 2021",
+            difficulty=5,
+            author=self.user,
+        )
+        self.problem3 = Problem.objects.create(
+            latex_code="Rozwiąż równanie $x^2 = 4$.",
+            source="Kangur",
+            difficulty=1,
+            author=self.user,
+        )
+
+    def test_search_latex_code(self):
+        results = list(search_problems(Problem.objects.all(), 'nierówność'))
+        self.assertEqual(results, [self.problem1])
+
+    def test_search_source(self):
+        results = list(search_problems(Problem.objects.all(), 'Kangur'))
+        self.assertEqual(results, [self.problem3])
+
+    def test_search_ranking(self):
+        results = list(search_problems(Problem.objects.all(), 'równanie'))
+        self.assertEqual(results, [self.problem2, self.problem3])
+
+    def test_search_prefix(self):
+        results = list(search_problems(Problem.objects.all(), 'funkcyj'))
+        self.assertEqual(results, [self.problem2])
+
+    def test_search_special_characters(self):
+        results = list(search_problems(Problem.objects.all(), '"$x^2 ('))
+        self.assertEqual(results, [self.problem3])
+
+    def test_search_index_follows_updates(self):
+        self.problem3.latex_code = "Rozwiąż układ równań."
+        self.problem3.save()
+        self.assertEqual(list(search_problems(Problem.objects.all(), 'układ')), [self.problem3])
+
+        self.problem3.delete()
+        self.assertEqual(list(search_problems(Problem.objects.all(), 'układ')), [])
+
+    def test_search_inside_words(self):
+        results = list(search_problems(Problem.objects.all(), 'ówność'))
+        self.assertEqual(results, [self.problem1])
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite search index')
+    def test_search_triggers_recreated(self):
+        # Migrations which make Django rebuild the table on SQLite drop its triggers
+        with connection.cursor() as cursor:
+            for name in SQLITE_FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {name}')
+        # Sources are matched by the index only
+        self.problem3.source = "Obóz naukowy"
+        self.problem3.save()
+        self.assertEqual(list(search_problems(Problem.objects.all(), 'Obóz')), [])
+
+        create_sqlite_search_triggers()
+        self.assertEqual(list(search_problems(Problem.objects.all(), 'Obóz')), [self.problem3])
+        problem = Problem.objects.create(latex_code="Rozwiąż układ nierówności.", source="Obóz", difficulty=2)
+        self.assertEqual(list(search_problems(Problem.objects.all(), 'Obóz')), [problem, self.problem3])
+
+    def test_search_combined_with_filters(self):
+        results = list(search_problems(Problem.objects.filter(difficulty__lt=3), 'równanie'))
+        self.assertEqual(results, [self.problem3])
+
+
+class ProblemSimilarityTests(TestCase):
+    def setUp(self):
+        self.problem1 = Problem.objects.create(
+            latex_code="Udowodnij, że dla dowolnych liczb rzeczywistych dodatnich $a, b, c$ zachodzi nierówność "
+                       "$\\frac{a}{b} + \\frac{b}{c} + \\frac{c}{a} \\geq 3$.",
+            difficulty=3,
+        )
+        self.problem2 = Problem.objects.create(
+            latex_code="Wyznacz wszystkie funkcje $f: \\mathbb{R} \\to \\mathbb{R}$ spełniające dla wszystkich "
+                       "liczb rzeczywistych $x, y$ równanie $f(x + y) = f(x) + f(y)$.",
+            difficulty=6,
+        )
+
+    def test_index_built_on_save(self):
+        self.assertEqual(ProblemLSHBucket.objects.filter(problem=self.problem1).count(), LSH_BANDS)
+
+    def test_finds_near_duplicate(self):
+        statement = ("Udowodnij, że dla dowolnych dodatnich liczb rzeczywistych $a,b,c$ prawdziwa jest nierówność "
+                     "$\\frac{a}{b}+\\frac{b}{c}+\\frac{c}{a}\\geq 3$.")
+        expected = [problem for problem in Problem.objects.order_by('problem_id')
+                    if fuzz.ratio(problem.latex_code, statement) > SIMILARITY_THRESHOLD]
+        self.assertEqual(expected, [self.problem1])
+        self.assertEqual(find_similar_problems(statement), expected)
+
+    def test_finds_rewritten_near_threshold(self):
+        # Clauses swapped and partly reworded, the score is just above the threshold
+        statement = ("Niech $a, b, c$ będą dodatnimi liczbami rzeczywistymi. Udowodnij, że "
+                     "$\\frac{a}{b} + \\frac{b}{c} + \\frac{c}{a} \\geq 3$.")
+        self.assertLess(fuzz.ratio(self.problem1.latex_code, statement), SIMILARITY_THRESHOLD + 5)
+        self.assertEqual(find_similar_problems(statement), [self.problem1])
+
+    def test_ignores_unrelated(self):
+        self.assertEqual(find_similar_problems("Ile jest liczb pierwszych mniejszych od $100$?"), [])
+
+    def test_index_follows_updates(self):
+        statement = self.problem1.latex_code
+        self.problem1.latex_code = "Rozwiąż w liczbach całkowitych równanie $x^2 - 2y^2 = 1$."
+        self.problem1.save()
+        self.assertEqual(find_similar_problems(statement), [])
+        self.assertEqual(find_similar_problems(self.problem1.latex_code), [self.problem1])
+
+        self.problem1.delete()
+        self.assertEqual(ProblemLSHBucket.objects.count(), LSH_BANDS)
+
+
+class ProblemFilterTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.problems = [Problem.objects.create(latex_code=f"Zadanie testowe numer {i}.", difficulty=1 + i % 10)
+                         for i in range(12)]
+        for problem in self.problems[:6]:
+            problem.tags.add('algebra')
+        for problem in self.problems[3:9]:
+            problem.tags.add('geometria')
+
+    def get_index(self, data):
+        request = self.factory.get('/bazahintow/', data)
+        request.user = AnonymousUser()
+        return index(request)
+
+    def test_filter_by_tags(self):
+        results = filter_problems_by_tags(Problem.objects.order_by('problem_id'), ['algebra', 'geometria'])
+        self.assertEqual(list(results), self.problems[3:6])
+
+        results = filter_problems_by_tags(Problem.objects.order_by('problem_id'), ['geometria'])
+        self.assertEqual(list(results), self.problems[3:9])
+
+        results = filter_problems_by_tags(Problem.objects.all(), ['algebra', 'kombinatoryka'])
+        self.assertEqual(list(results), [])
+
+    def test_filters_combined(self):
+        problems = Problem.objects.filter(difficulty__lt=6).order_by('problem_id')
+        results = search_problems(filter_problems_by_tags(problems, ['geometria']), 'testowe')
+        self.assertEqual(set(results), {self.problems[3], self.problems[4]})
+
+    def test_constant_query_count(self):
+        data = {'tags_to_filter': ['algebra', 'geometria'], 'difficulty': '1,2,3,4,5,6', 'search': 'zadanie'}
+        with CaptureQueriesContext(connection) as small_base:
+            self.get_index(data)
+
+        for i in range(30):
+            problem = Problem.objects.create(latex_code=f"Inne zadanie numer {i}.", difficulty=4)
+            problem.tags.add('algebra', 'geometria')
+
+        with CaptureQueriesContext(connection) as large_base:
+            response = self.get_index(data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(large_base), len(small_base))
+
+
+class ProblemPaginationTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.problems = [Problem.objects.create(latex_code=f"Zadanie {'trudne ' * (i % 4)}numer {i}.", difficulty=3)
+                         for i in range(PROBLEMS_PER_PAGE * 2 + 5)]
+
+    def walk(self, queryset, page_size):
+        seen, cursor = [], None
+        while True:
+            problems, cursor = keyset_page(queryset, cursor, page_size)
+            self.assertLessEqual(len(problems), page_size)
+            seen.extend(problems)
+            if cursor is None:
+                return seen
+
+    def test_keyset_pages(self):
+        seen = self.walk(Problem.objects.all(), 7)
+        self.assertEqual(seen, sorted(self.problems, key=lambda problem: -problem.problem_id))
+
+    def test_keyset_pages_ranked(self):
+        queryset = search_problems(Problem.objects.all(), 'trudne')
+        seen = self.walk(queryset, 4)
+        self.assertEqual(seen, list(queryset))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_keyset_pages_tied_ranks(self):
+        tied = [Problem.objects.create(latex_code='Zadanie remisowe o kwadracie.', difficulty=3) for _ in range(9)]
+        queryset = search_problems(Problem.objects.all(), 'remisowe')
+        self.assertEqual(len({problem.search_rank for problem in queryset}), 1)
+        seen = self.walk(queryset, 4)
+        self.assertEqual(seen, sorted(tied, key=lambda problem: -problem.problem_id))
+
+    def test_invalid_cursor(self):
+        problems, cursor = keyset_page(Problem.objects.all(), 'abc', PROBLEMS_PER_PAGE)
+        self.assertEqual(problems[0], self.problems[-1])
+
+    def test_problem_list_fragment(self):
+        request = self.factory.get('/bazahintow/problems/', {'after': self.problems[-1].problem_id})
+        request.user = AnonymousUser()
+        response = problem_list(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode().count('problem-block'), PROBLEMS_PER_PAGE)
+        self.assertIn(f'after={self.problems[-PROBLEMS_PER_PAGE - 1].problem_id}', response.content.decode())
+
+
+class ProblemPreviewTests(TestCase):
+    def test_short_text_unchanged(self):
+        self.assertEqual(latex_preview("Rozwiąż równanie $x^2 = 4$."), "Rozwiąż równanie $x^2 = 4$.")
+
+    def test_cut_at_space(self):
+        text = "Udowodnij, że dla dowolnych liczb rzeczywistych dodatnich zachodzi pewna nierówność."
+        self.assertEqual(latex_preview(text), "Udowodnij, że dla dowolnych liczb rzeczywistych ...")
+
+    def test_math_not_split(self):
+        text = "Udowodnij, że dla liczb $a, b, c, d, e, f, g, h, i, j, k, l$ zachodzi pewna nierówność."
+        self.assertEqual(latex_preview(text), "Udowodnij, że dla liczb $a, b, c, d, e, f, g, h, i, j, k, l$ ...")
+
+    def test_escaped_delimiter(self):
+        text = "Cena wynosi \\$5, a nie \\$7. Ile wynosi cena? Odpowiedź uzasadnij odpowiednim rachunkiem."
+        self.assertEqual(latex_preview(text), "Cena wynosi \\$5, a nie \\$7. Ile wynosi cena? ...")
+
+    def test_preview_stored_on_save(self):
+        problem = Problem.objects.create(latex_code="Krótkie zadanie.", difficulty=1)
+        self.assertEqual(problem.preview, "Krótkie zadanie.")
+
+        problem.latex_code = "Udowodnij, że dla dowolnych liczb rzeczywistych dodatnich zachodzi pewna nierówność."
+        problem.save(update_fields=['latex_code'])
+        problem.refresh_from_db()
+        self.assertEqual(problem.preview, latex_preview(problem.latex_code))
+
+
+class ReviewRatingTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'voter{i}', password='userpass', email=f'voter{i}@test.com')
+                      for i in range(3)]
+        self.problem = Problem.objects.create(latex_code="Zadanie do oceny.", difficulty=5)
+        self.review = Review.objects.create(problem=self.problem, current_rating=5)
+
+    def test_add_ratings(self):
+        for user, value in zip(self.users, [3, 4, 8]):
+            self.review.add_rating(user, value)
+        self.review.refresh_from_db()
+        self.problem.refresh_from_db()
+        self.assertEqual((self.review.rating_sum, self.review.rating_count), (15, 3))
+        self.assertEqual(self.review.current_rating, 5)
+        self.assertEqual(self.problem.difficulty, 5)
+
+    def test_change_rating(self):
+        self.review.add_rating(self.users[0], 3)
+        self.review.add_rating(self.users[1], 4)
+        self.review.add_rating(self.users[0], 6)
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.rating_sum, self.review.rating_count), (10, 2))
+        self.assertEqual(self.review.current_rating, 5)
+        self.assertEqual(ProblemRating.objects.get(review=self.review, user=self.users[0]).value, 6)
+
+    def test_rounding(self):
+        for user, value in zip(self.users, [1, 1, 2]):
+            self.review.add_rating(user, value)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.current_rating, 1.33)
+
+    def test_constant_query_count(self):
+        self.review.add_rating(self.users[0], 3)
+        with CaptureQueriesContext(connection) as first_votes:
+            self.review.add_rating(self.users[1], 4)
+        for i in range(20):
+            user = User.objects.create_user(username=f'other{i}', password='userpass', email=f'other{i}@test.com')
+            self.review.add_rating(user, 5)
+        with CaptureQueriesContext(connection) as later_votes:
+            self.review.add_rating(self.users[2], 6)
+        self.assertEqual(len(later_votes), len(first_votes))
+
+    def test_update_rating_recalculates(self):
+        self.review.add_rating(self.users[0], 3)
+        self.review.add_rating(self.users[1], 7)
+        ProblemRating.objects.filter(user=self.users[1]).update(value=9)
+        self.review.update_rating()
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.rating_sum, self.review.current_rating), (12, 6))
+
+    def test_concurrent_first_vote(self):
+        self.review.add_rating(self.users[0], 3)
+        # The lookup misses the rating committed by a concurrent request of the same user
+        stale = [ProblemRating.objects.none()]
+        select_for_update = ProblemRating.objects.select_for_update
+        with mock.patch.object(ProblemRating.objects, 'select_for_update',
+                               side_effect=lambda: stale.pop() if stale else select_for_update()):
+            self.review.add_rating(self.users[0], 7)
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.rating_sum, self.review.rating_count), (7, 1))
+        self.assertEqual(ProblemRating.objects.get(review=self.review, user=self.users[0]).value, 7)
+
+    def test_value_must_be_integer(self):
+        with self.assertRaises(ValueError):
+            self.review.add_rating(self.users[0], 4.5)
+
+
+class ProblemDetailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.author = User.objects.create_user(username='author', password='userpass', email='author@test.com')
+        self.voter = User.objects.create_user(username='voter', password='userpass', email='voter@test.com')
+        self.problem = Problem.objects.create(latex_code="Udowodnij, że $\\sqrt{2}$ jest niewymierny.",
+                                              difficulty=4, author=self.author, source="OM")
+        self.problem.tags.add('algebra')
+        self.hint = ProblemHint.objects.create(problem=self.problem, author=self.author, verified=True,
+                                               hints="Załóż nie wprost.", latex_solution="Rozwiązanie pierwsze.")
+
+    def get(self, user=None):
+        request = self.factory.get(f'/bazahintow/view_problem/{self.problem.problem_id}/')
+        request.user = user or AnonymousUser()
+        return view_problem(request, self.problem.problem_id)
+
+    def vote(self, value):
+        request = self.factory.post(f'/bazahintow/view_problem/{self.problem.problem_id}/', {'difficulty': value})
+        request.user = self.voter
+        return view_problem(request, self.problem.problem_id)
+
+    def test_get_does_not_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Review.objects.exists())
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries))
+        content = response.content.decode()
+        self.assertIn('Rozwiązanie pierwsze.', content)
+        self.assertIn('algebra', content)
+
+    def test_cached_get_skips_database(self):
+        self.get()
+        with self.assertNumQueries(0):
+            response = self.get()
+        self.assertIn('Rozwiązanie pierwsze.', response.content.decode())
+
+    def test_missing_problem(self):
+        request = self.factory.get('/bazahintow/view_problem/0/')
+        request.user = AnonymousUser()
+        with self.assertRaises(Http404):
+            view_problem(request, 0)
+
+    def test_cache_cleared_on_hint_changes(self):
+        self.get()
+        ProblemHint.objects.create(problem=self.problem, author=self.author, verified=True,
+                                   hints="", latex_solution="Rozwiązanie drugie.")
+        self.assertIn('Rozwiązanie drugie.', self.get().content.decode())
+        self.hint.delete()
+        self.assertNotIn('Rozwiązanie pierwsze.', self.get().content.decode())
+
+    def test_cache_cleared_on_problem_changes(self):
+        self.get()
+        self.problem.source = "Olimpiada Matematyczna Juniorów"
+        self.problem.save()
+        self.assertIn('Olimpiada Matematyczna Juniorów', self.get().content.decode())
+        self.problem.tags.add('geometria')
+        self.assertIn('geometria', self.get().content.decode())
+
+    def test_vote_updates_cached_rating(self):
+        self.get()
+        response = self.vote(9)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Review.objects.get(problem=self.problem).current_rating, 9)
+        self.assertEqual(get_problem_detail_data(self.problem.problem_id)['rating'], 9)
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import User, ActivityScore
+
+
+class PaginationModeTests(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass', email='admin@test.com')
+        now = timezone.now()
+        self.scores = ActivityScore.objects.bulk_create(
+            [ActivityScore(user=self.admin_user, change=i, reason='test', timestamp=now + timedelta(minutes=i // 2))
+             for i in range(25)])
+        self.client.force_authenticate(self.admin_user)
+
+    def test_cursor_walks_whole_table(self):
+        seen = []
+        url = '/api/activity-scores/?cursor=&limit=10'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+            seen.extend(score['change'] for score in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), list(range(25)))
+        self.assertEqual(len(seen), 25)
+
+    def test_cursor_ignored_without_ordering(self):
+        response = self.client.get('/api/users/', {'cursor': ''})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_count_free_pages(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/activity-scores/', {'count': 'false', 'limit': 10, 'offset': 10})
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+        self.assertIsNone(response.data['count'])
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIn('offset=20', response.data['next'])
+        self.assertNotIn('offset', response.data['previous'])
+
+        response = self.client.get('/api/activity-scores/', {'count': 'false', 'limit': 10, 'offset': 20})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_estimated_count(self):
+        # SQLite has no planner estimates, the count is exact
+        response = self.client.get('/api/activity-scores/', {'count': 'estimate', 'limit': 10})
+        self.assertEqual(response.data['count'], 25)
+        self.assertIsNotNone(response.data['next'])
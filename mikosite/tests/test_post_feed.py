@@ -0,0 +1,96 @@
+from datetime import date, time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from accounts.models import User
+from mainSite import models as mainsite_models
+from mainSite.models import Post
+from mainSite.views import MAINSITE_POSTS_PER_PAGE, get_posts_page
+
+
+class PostFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='autor', password='pass', email='autor@test.com')
+        self.posts = [Post.objects.create(title=f"Post {i}", date=date(2024, 1, i + 1), time=time(12, 0),
+                                          content=f"Treść **{i}**")
+                      for i in range(MAINSITE_POSTS_PER_PAGE + 2)]
+
+    def titles(self, page):
+        return [post['title'] for post in get_posts_page(page)['posts']]
+
+    def test_pages(self):
+        first = get_posts_page(1)
+        self.assertEqual(len(first['posts']), MAINSITE_POSTS_PER_PAGE)
+        self.assertEqual(first['posts'][0]['title'], f"Post {MAINSITE_POSTS_PER_PAGE + 1}")
+        self.assertIsNone(first['previous_page'])
+        self.assertEqual(first['next_page'], 2)
+
+        second = get_posts_page(2)
+        self.assertEqual([post['title'] for post in second['posts']], ["Post 1", "Post 0"])
+        self.assertEqual(second['previous_page'], 1)
+        self.assertIsNone(second['next_page'])
+
+    def test_cached_page_queries_only_ids(self):
+        get_posts_page(1)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(get_posts_page(1)['posts']), MAINSITE_POSTS_PER_PAGE)
+
+    def test_edit_recomputes_only_edited_post(self):
+        get_posts_page(2)
+        post = self.posts[0]
+        post.title = "Zmieniony"
+        post.save()
+        with mock.patch.object(Post, 'display_dict', autospec=True, side_effect=Post.display_dict) as display_dict:
+            self.assertEqual(self.titles(2), ["Post 1", "Zmieniony"])
+        self.assertEqual([call.args[0].pk for call in display_dict.call_args_list], [post.pk])
+
+    def test_author_change_refreshes_post(self):
+        self.assertEqual(get_posts_page(2)['posts'][1]['authors'], [])
+        self.posts[0].authors.add(self.author)
+        self.assertEqual(get_posts_page(2)['posts'][1]['authors'][0]['username'], 'autor')
+        self.author.post_set.clear()
+        self.assertEqual(get_posts_page(2)['posts'][1]['authors'], [])
+
+    def test_index_page_parameter(self):
+        response = self.client.get('/', {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post['title'] for post in response.context['posts']], ["Post 1", "Post 0"])
+        response = self.client.get('/', {'page': 'abc'})
+        self.assertEqual(response.context['page'], 1)
+
+
+class PostMarkdownTests(TestCase):
+    def setUp(self):
+        self.post = Post.objects.create(title="Post", date=date(2024, 1, 1), time=time(12, 0),
+                                        content="# Nagłówek\n\n**pogrubienie**")
+
+    def test_rendered_on_save(self):
+        self.assertEqual(self.post.content_html, "<p>Nagłówek</p>\n<p><strong>pogrubienie</strong></p>")
+        self.post.content = "*nowa*"
+        self.post.save(update_fields=['content'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.content_html, "<p><em>nowa</em></p>")
+
+    def test_display_skips_markdown(self):
+        post = Post.objects.get(pk=self.post.pk)
+        with mock.patch.object(mainsite_models, 'render_markdown') as render_markdown:
+            self.assertEqual(post.display_dict()['content'], self.post.content_html)
+        render_markdown.assert_not_called()
+
+    def test_renderposts_updates_outdated_posts(self):
+        Post.objects.filter(pk=self.post.pk).update(content_html="stary", content_html_version=0)
+        updated_at = self.post.updated_at
+        self.assertEqual(Post.objects.get(pk=self.post.pk).display_dict()['content'], self.post.content_html)
+
+        call_command('renderposts')
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.content_html, self.post.content_html)
+        self.assertGreater(post.updated_at, updated_at)
+
+    def test_display_only_api_returns_html(self):
+        response = self.client.get(f'/api/posts/{self.post.pk}/', {'display_only': '1'})
+        self.assertEqual(response.data['content_html'], self.post.content_html)
@@ -0,0 +1,158 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import User
+from mainSite.views import get_upcoming_seminars_data
+from seminars.bulk import import_seminars
+from seminars.models import Reminder, Seminar
+from seminars.reminders import LocalSink, ReminderScheduler, RETRY_DELAY
+
+
+class FailingSink(LocalSink):
+    def send(self, reminder, payload):
+        raise ConnectionError("Webhook unavailable")
+
+
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now().replace(microsecond=0)
+        start = timezone.localtime(self.now + timedelta(days=1))
+        self.seminar = Seminar.objects.create(date=start.date(), time=start.time(), duration=timedelta(hours=1),
+                                              theme="Nierówności")
+        # Reminders created by the seminar signal are far in the future
+        self.due = Reminder.objects.create(seminar=self.seminar, type="invite", date_time=self.now - timedelta(minutes=1))
+        self.later = Reminder.objects.create(seminar=self.seminar, type="feedback",
+                                             date_time=self.now + timedelta(minutes=10))
+        self.missed = Reminder.objects.create(seminar=self.seminar, type="invite", date_time=self.now - timedelta(days=2))
+        self.sink = LocalSink()
+        self.scheduler = ReminderScheduler(self.sink)
+        with self.assertLogs('seminars.reminders', level='WARNING'):  # The missed reminder is given up
+            self.scheduler.load(now=self.now)
+
+    def test_sends_due_reminders(self):
+        self.assertEqual(self.scheduler.dispatch_due(now=self.now), 1)
+        self.assertEqual([payload['id'] for payload in self.sink.sent], [self.due.id])
+        self.assertEqual(self.sink.sent[0]['type'], "invite")
+        self.due.refresh_from_db()
+        self.assertTrue(self.due.pinged)
+        self.assertEqual(self.scheduler.seconds_to_next(now=self.now), 600)
+
+    def test_sends_later_reminders_in_order(self):
+        self.scheduler.dispatch_due(now=self.now + timedelta(minutes=10))
+        self.assertEqual([payload['id'] for payload in self.sink.sent], [self.due.id, self.later.id])
+        self.assertEqual(self.scheduler.dispatch_due(now=self.now + timedelta(hours=1)), 0)
+
+    def test_skips_missed_reminders(self):
+        self.scheduler.dispatch_due(now=self.now + timedelta(days=5))
+        self.assertNotIn(self.missed.id, [payload['id'] for payload in self.sink.sent])
+        self.missed.refresh_from_db()
+        self.assertTrue(self.missed.pinged)
+
+    def test_gives_up_failing_reminders(self):
+        self.scheduler.sink = FailingSink()
+        with self.assertLogs('seminars.reminders', level='ERROR'):
+            self.scheduler.dispatch_due(now=self.now)
+        with self.assertLogs('seminars.reminders', level='WARNING') as logs:
+            self.scheduler.load(now=self.now + timedelta(hours=2))
+        self.assertIn(str(self.due.id), logs.output[0])
+        self.due.refresh_from_db()
+        self.assertTrue(self.due.pinged)
+        self.scheduler.sink = self.sink
+        self.scheduler.dispatch_due(now=self.now + timedelta(hours=2))
+        self.assertEqual(self.sink.sent, [])
+
+    def test_follows_edits(self):
+        version = ReminderScheduler.current_version()
+        self.due.date_time = self.now + timedelta(minutes=5)
+        self.due.save()
+        self.assertNotEqual(ReminderScheduler.current_version(), version)
+
+        # The old schedule is not used even before reloading
+        self.assertEqual(self.scheduler.dispatch_due(now=self.now), 0)
+        self.scheduler.load(now=self.now)
+        self.assertEqual(self.scheduler.seconds_to_next(now=self.now), 300)
+        self.assertEqual(self.scheduler.dispatch_due(now=self.now + timedelta(minutes=5)), 1)
+
+    def test_sent_once_by_concurrent_schedulers(self):
+        other_sink = LocalSink()
+        other = ReminderScheduler(other_sink)
+        other.load(now=self.now)
+        self.scheduler.dispatch_due(now=self.now)
+        other.dispatch_due(now=self.now)
+        self.assertEqual(len(self.sink.sent) + len(other_sink.sent), 1)
+
+    def test_retries_after_failure(self):
+        self.scheduler.sink = FailingSink()
+        with self.assertLogs('seminars.reminders', level='ERROR'):
+            self.assertEqual(self.scheduler.dispatch_due(now=self.now), 0)
+        self.due.refresh_from_db()
+        self.assertFalse(self.due.pinged)
+        self.assertEqual(self.scheduler.seconds_to_next(now=self.now), RETRY_DELAY.total_seconds())
+
+        # A reload does not bring the retry forward
+        self.scheduler.load(now=self.now)
+        self.assertEqual(self.scheduler.seconds_to_next(now=self.now), RETRY_DELAY.total_seconds())
+
+        self.scheduler.sink = self.sink
+        self.scheduler.dispatch_due(now=self.now + RETRY_DELAY)
+        self.assertEqual([payload['id'] for payload in self.sink.sent], [self.due.id])
+
+    def test_run_until_stopped(self):
+        scheduler = ReminderScheduler(self.sink)
+        self.sink.send = lambda reminder, payload: (self.sink.sent.append(payload), scheduler.stop())
+        scheduler.run()
+        self.assertEqual([payload['id'] for payload in self.sink.sent], [self.due.id])
+        self.assertNotIn(scheduler, ReminderScheduler._instances)
+
+
+class SeminarReminderTests(TestCase):
+    def make_seminar(self, day=1, **kwargs):
+        return Seminar(date=date(2030, 1, day), time=time(18, 0), duration=timedelta(hours=2),
+                       theme=f"Seminarium {day}", **kwargs)
+
+    def reminder_times(self, seminar):
+        return dict(seminar.reminder.values_list('type', 'date_time'))
+
+    def expected_times(self, day, hour=18):
+        start = timezone.make_aware(datetime(2030, 1, day, hour))
+        return {"invite": start - timedelta(hours=1), "feedback": start + timedelta(hours=2)}
+
+    def test_reminders_created_with_seminar(self):
+        seminar = self.make_seminar()
+        with self.assertNumQueries(2):
+            seminar.save()
+        self.assertEqual(self.reminder_times(seminar), self.expected_times(1))
+
+    def test_reminders_moved_with_seminar(self):
+        seminar = self.make_seminar()
+        seminar.save()
+        seminar.time = time(16, 0)
+        with self.assertNumQueries(2):
+            seminar.save()
+        self.assertEqual(self.reminder_times(seminar), self.expected_times(1, hour=16))
+
+    def test_import_seminars(self):
+        tutor = User.objects.create_user(username='tutor', password='userpass', email='tutor@test.com')
+        cache.clear()
+        self.assertEqual(get_upcoming_seminars_data(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            seminars = import_seminars([self.make_seminar(day) for day in range(1, 4)], [[tutor.pk], [], [tutor.pk]])
+
+        self.assertEqual(Reminder.objects.count(), 6)
+        self.assertEqual(self.reminder_times(seminars[1]), self.expected_times(2))
+        self.assertEqual(list(tutor.seminar_set.order_by('date')), [seminars[0], seminars[2]])
+        with self.settings(CACHE_REFRESH_IN_BACKGROUND=False):
+            self.assertEqual(len(get_upcoming_seminars_data()), 3)
+
+    def test_import_constant_query_count(self):
+        with CaptureQueriesContext(connection) as few:
+            import_seminars([self.make_seminar(day) for day in range(1, 3)], [[]] * 2)
+        with CaptureQueriesContext(connection) as many:
+            import_seminars([self.make_seminar(day) for day in range(1, 29)], [[]] * 28)
+        self.assertEqual(len(many), len(few))
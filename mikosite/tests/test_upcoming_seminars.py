@@ -0,0 +1,76 @@
+import time as time_module
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from mainSite.views import UPCOMING_SEMINARS_CACHE_KEY, get_upcoming_seminars_data
+from mikosite.caching import peek
+from seminars.models import Seminar
+
+
+class FetchUpcomingTests(TestCase):
+    now = datetime(2030, 1, 1, 12, 0)
+
+    def create(self, day, hour, theme=None):
+        return Seminar.objects.create(date=date(2030, 1, day), time=time(hour, 0), duration=timedelta(hours=1),
+                                      theme=theme or f"Seminar {day} {hour}")
+
+    def test_next_three(self):
+        self.create(1, 10)
+        expected = [self.create(1, 18), self.create(2, 18), self.create(3, 18)]
+        self.create(4, 18)
+        with self.assertNumQueries(2):  # Seminars with groups, then tutors
+            self.assertEqual(Seminar.fetch_upcoming(self.now), expected)
+
+    def test_whole_first_day(self):
+        expected = [self.create(2, hour) for hour in (10, 12, 14, 16)]
+        self.create(3, 10)
+        self.assertEqual(Seminar.fetch_upcoming(self.now), expected)
+
+    def test_no_upcoming(self):
+        self.create(1, 10)
+        self.assertEqual(Seminar.fetch_upcoming(self.now), [])
+
+
+@override_settings(CACHE_REFRESH_IN_BACKGROUND=False)
+class UpcomingSeminarsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = datetime.now()
+        self.past = Seminar.objects.create(date=(now - timedelta(days=1)).date(), time=time(18, 0),
+                                           duration=timedelta(hours=1), theme="Wczorajsze")
+        start = now + timedelta(hours=2)
+        self.upcoming = Seminar.objects.create(date=start.date(), time=start.time().replace(microsecond=0),
+                                               duration=timedelta(hours=1), theme="Nadchodzące")
+
+    def test_cached(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.assertEqual([seminar['theme'] for seminar in get_upcoming_seminars_data()], ["Nadchodzące"])
+        self.assertAlmostEqual(cache_set.call_args.args[1]['fresh_until'] - time_module.time(), 7200, delta=5)
+        with self.assertNumQueries(0):
+            get_upcoming_seminars_data()
+
+    def test_past_seminar_changes_keep_cache(self):
+        get_upcoming_seminars_data()
+        self.past.started = True
+        self.past.finished = True
+        self.past.save()
+        with self.assertNumQueries(0):
+            get_upcoming_seminars_data()
+
+    def test_upcoming_seminar_changes_refresh_cache(self):
+        get_upcoming_seminars_data()
+        self.upcoming.theme = "Zmienione"
+        self.upcoming.save()
+        self.assertEqual([seminar['theme'] for seminar in get_upcoming_seminars_data()], ["Zmienione"])
+        with self.assertNumQueries(0):
+            get_upcoming_seminars_data()
+
+    def test_moving_seminar_to_future_refreshes_cache(self):
+        get_upcoming_seminars_data()
+        self.past.date = self.upcoming.date + timedelta(days=1)
+        self.past.save()
+        self.assertEqual(len(get_upcoming_seminars_data()), 2)
+        self.assertEqual(len(peek(UPCOMING_SEMINARS_CACHE_KEY)['ids']), 2)